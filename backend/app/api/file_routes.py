@@ -1,21 +1,25 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from typing import List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional
 import os
+import time
 from app.schemas.file_schemas import (
     FileUploadResponse, FileInfo, SearchRequest, SearchResponse,
-    VectorDocument, CollectionInfo, DeleteRequest, DeleteResponse, SearchResult
+    VectorDocument, CollectionInfo, DeleteRequest, DeleteResponse, SearchResult,
+    DocumentListResponse, CollectionStats, AskRequest
 )
 from app.services.storage_service import storage_service
 from app.services.vector_service import vector_service
-from app.services.document_service import document_service
+from app.services.document_service import document_service, get_pipeline_version
+from app.services.answer_service import answer_service
 from app.core.config import settings
+from app.core.admission import enforce_rate_limit, stage_limiter, StageStreamingResponse
 
 router = APIRouter(prefix="/files", tags=["files"])
 
 
 @router.post("/upload", response_model=FileUploadResponse)
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(http_request: Request, file: UploadFile = File(...)):
     """
     Upload a file and process it for vector storage
     """
@@ -35,28 +39,33 @@ async def upload_file(file: UploadFile = File(...)):
                 detail=f"File too large. Maximum size: {settings.max_file_size // (1024*1024)}MB"
             )
         
-        # Upload file to storage
-        upload_result = await storage_service.upload_file(file)
-        
-        # Read file content for processing (we need to read it again since storage service consumed it)
-        await file.seek(0)  # Reset file pointer
-        file_content = await file.read()
-        
-        # Process file and create chunks
-        metadata = {
-            'filename': upload_result['filename'],
-            'original_filename': upload_result['original_filename'],
-            'content_type': upload_result['content_type'],
-            'file_size': upload_result['file_size'],
-            'uploaded_at': upload_result['uploaded_at']
-        }
-        
-        chunks = await document_service.process_file(
-            file_content, file_extension, metadata
-        )
-        
-        # Add chunks to vector database
-        vector_ids = await vector_service.add_documents(chunks)
+        # Charge by size and wait for an extraction slot before storing anything
+        enforce_rate_limit(http_request, "upload", (file.size or 0) / (1024 * 1024))
+        async with stage_limiter.stage("extraction"):
+            # Upload file to storage
+            upload_result = await storage_service.upload_file(file)
+            
+            # Read file content for processing (we need to read it again since storage service consumed it)
+            await file.seek(0)  # Reset file pointer
+            file_content = await file.read()
+            
+            # Process file and create chunks
+            metadata = {
+                'filename': upload_result['filename'],
+                'original_filename': upload_result['original_filename'],
+                'content_type': upload_result['content_type'],
+                'file_size': upload_result['file_size'],
+                'uploaded_at': upload_result['uploaded_at'],
+                'content_hash': upload_result['content_hash'],
+                'pipeline_version': get_pipeline_version(file_extension)
+            }
+            
+            chunks = await document_service.process_file(
+                file_content, file_extension, metadata
+            )
+            
+            # Add chunks to vector database
+            vector_ids = await vector_service.add_documents(chunks)
         
         return FileUploadResponse(
             filename=upload_result['filename'],
@@ -87,14 +96,16 @@ async def list_files():
 
 
 @router.post("/search", response_model=SearchResponse)
-async def search_documents(request: SearchRequest):
+async def search_documents(request: SearchRequest, http_request: Request):
     """
     Search for documents using semantic similarity
     """
+    enforce_rate_limit(http_request, "search", request.n_results)
     try:
-        results = await vector_service.search_documents(
-            request.query, request.n_results
-        )
+        async with stage_limiter.stage("search"):
+            results = await vector_service.search_documents(
+                request.query, request.n_results
+            )
         
         search_results = [
             SearchResult(
@@ -112,18 +123,70 @@ async def search_documents(request: SearchRequest):
             total_results=len(search_results)
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 
-@router.get("/documents", response_model=List[VectorDocument])
-async def list_documents(limit: int = 100):
+@router.post("/ask")
+async def ask_question(request: AskRequest, http_request: Request):
     """
-    List documents in the vector database
+    Answer a question from the documents, streamed as Server-Sent Events
+    ('context', then 'token' events, then 'done' with timings)
     """
+    started = time.perf_counter()
+    n_results = request.n_results or settings.ask_n_results
+    enforce_rate_limit(http_request, "ask", n_results)
+    
+    # The slot is held until the response finishes sending, not just until it starts
+    await stage_limiter.acquire("ask")
     try:
-        documents = await vector_service.list_documents(limit)
-        return [VectorDocument(**doc) for doc in documents]
+        generator = answer_service.get_generator()
+        passages = await answer_service.prepare(
+            request.question,
+            n_results,
+            request.max_context_tokens or settings.ask_max_context_tokens
+        )
+    except Exception as e:
+        stage_limiter.release("ask")
+        raise HTTPException(status_code=500, detail=f"Failed to answer question: {str(e)}")
+    
+    retrieval_ms = (time.perf_counter() - started) * 1000
+    return StageStreamingResponse(
+        answer_service.stream_answer(request.question, passages, generator, started, retrieval_ms),
+        stage="ask",
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/documents", response_model=DocumentListResponse)
+async def list_documents(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    include: List[str] = Query(["documents", "metadatas"]),
+    filename: Optional[str] = None
+):
+    """
+    List documents in the vector database, paginated by offset.
+    Pass the returned next_offset as offset to fetch the following page.
+    """
+    invalid = [field for field in include if field not in ("documents", "metadatas")]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid include fields: {invalid}. Allowed fields: ['documents', 'metadatas']"
+        )
+    
+    try:
+        page = await vector_service.list_documents(limit, offset, include, filename)
+        return DocumentListResponse(
+            documents=[VectorDocument(**doc) for doc in page['documents']],
+            offset=page['offset'],
+            limit=page['limit'],
+            next_offset=page['next_offset']
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list documents: {str(e)}")
 
@@ -140,6 +203,30 @@ async def get_collection_info():
         raise HTTPException(status_code=500, detail=f"Failed to get collection info: {str(e)}")
 
 
+@router.get("/collection-stats", response_model=CollectionStats)
+async def get_collection_stats(include_files: bool = False):
+    """
+    Get chunk, byte and ingestion statistics without scanning the collection
+    """
+    try:
+        stats = await vector_service.get_collection_stats(include_files)
+        return CollectionStats(**stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get collection stats: {str(e)}")
+
+
+@router.post("/collection-stats/rebuild", response_model=CollectionStats)
+async def rebuild_collection_stats():
+    """
+    Recompute collection statistics from a full scan to correct drift
+    """
+    try:
+        stats = await vector_service.rebuild_stats()
+        return CollectionStats(**stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild collection stats: {str(e)}")
+
+
 @router.delete("/documents", response_model=DeleteResponse)
 async def delete_documents(request: DeleteRequest):
     """
@@ -165,11 +252,7 @@ async def delete_file(filename: str):
     """
     try:
         # First, get the document IDs for this file from the vector database
-        documents = await vector_service.list_documents(limit=1000)  # Get all documents
-        file_document_ids = [
-            doc['id'] for doc in documents 
-            if doc.get('metadata', {}).get('filename') == filename
-        ]
+        file_document_ids = await vector_service.get_document_ids(filename)
         
         # Delete file from storage
         success = await storage_service.delete_file(filename)
@@ -191,7 +274,6 @@ async def delete_file(filename: str):
         raise HTTPException(status_code=500, detail=f"Failed to delete file: {str(e)}")
 
 
-from fastapi.responses import StreamingResponse
 import io
 
 @router.get("/download/{filename}")
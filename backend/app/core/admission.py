@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+
+
+def client_key(request: Request) -> str:
+    """
+    Identify the client a request is charged to: its API key if it sent one
+    listed in settings.api_keys, otherwise its IP address
+
+    Unknown keys are charged to the IP, so sending a fresh key with every
+    request does not get a fresh bucket.
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key and api_key in settings.api_keys:
+        # Never store the key itself
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    if settings.rate_limit_trust_forwarded_for:
+        # Proxies append to whatever the client sent, so only the entries
+        # added by our own proxies, counted from the right, can be trusted
+        forwarded = [
+            entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",") if entry.strip()
+        ]
+        hops = max(1, settings.rate_limit_proxy_hops)
+        if len(forwarded) >= hops:
+            return "ip:" + forwarded[-hops]
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+class RateLimiter:
+    """
+    Per-client token buckets, kept in memory by each worker process.
+
+    Each client has a bucket of rate_limit_capacity tokens that refills at
+    rate_limit_refill_per_second. A request takes tokens equal to its cost,
+    so expensive calls (large uploads, many search results) use up the
+    budget faster than cheap ones.
+
+    Requests are spread over the web workers, so each worker enforces its
+    share of the limit (capacity and refill divided by web_concurrency)
+    without any cross-process lock on the request path.
+    """
+
+    def __init__(self):
+        workers = max(1, settings.web_concurrency)
+        self.capacity = settings.rate_limit_capacity / workers
+        self.refill_rate = settings.rate_limit_refill_per_second / workers
+        self._lock = threading.Lock()
+        # client -> (tokens, updated_at)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._pid = None
+        self._calls = 0
+
+    def acquire(self, client: str, cost: float) -> float:
+        """
+        Take tokens from a client's bucket
+
+        Args:
+            client: Client key
+            cost: Number of tokens the request costs
+
+        Returns:
+            0 if the request is allowed, otherwise the seconds until enough
+            tokens have refilled
+        """
+        # A request costing more than the bucket holds is allowed once the bucket is full
+        cost = min(cost, self.capacity)
+        now = time.monotonic()
+        with self._lock:
+            # Buckets inherited across a fork belong to the parent's share
+            if self._pid != os.getpid():
+                self._buckets = {}
+                self._pid = os.getpid()
+
+            tokens = self.capacity
+            if client in self._buckets:
+                previous, updated_at = self._buckets[client]
+                tokens = min(self.capacity, previous + (now - updated_at) * self.refill_rate)
+
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / self.refill_rate
+            self._buckets[client] = (tokens, now)
+
+            # Buckets idle long enough to be full again carry no state
+            self._calls += 1
+            if self._calls % 1000 == 0:
+                full_after = self.capacity / self.refill_rate
+                self._buckets = {
+                    key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < full_after
+                }
+        return wait
+
+
+class StageLimiter:
+    """
+    Caps how many requests run an expensive pipeline stage at once in this worker.
+
+    Requests wait for a slot up to stage_queue_timeout_seconds and are then
+    turned away with 503, so a burst queues briefly instead of piling up
+    behind ChromaDB and the extraction pool.
+    """
+
+    def __init__(self):
+        self.limits = {
+            "extraction": settings.extraction_concurrency,
+            "search": settings.search_concurrency,
+            "ask": settings.ask_concurrency,
+        }
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def acquire(self, name: str):
+        """
+        Wait for a slot of the given stage, rejecting with 503 if none frees up in time
+
+        Args:
+            name: Pipeline stage ('extraction', 'search' or 'ask')
+        """
+        if name not in self._semaphores:
+            self._semaphores[name] = asyncio.Semaphore(self.limits[name])
+        try:
+            await asyncio.wait_for(self._semaphores[name].acquire(), timeout=settings.stage_queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Server busy: too many concurrent {name} requests",
+                headers={"Retry-After": str(max(1, math.ceil(settings.stage_queue_timeout_seconds)))}
+            )
+
+    def release(self, name: str):
+        """Release a slot taken with acquire()"""
+        self._semaphores[name].release()
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        """
+        Run the enclosed block while holding a slot of the given stage
+
+        Args:
+            name: Pipeline stage ('extraction', 'search' or 'ask')
+        """
+        await self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+
+class StageStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that releases a stage slot taken with stage_limiter.acquire()
+    once it is done sending.
+
+    Releasing from a finally in the body generator is not enough: if the
+    client disconnects before the body is iterated, that finally never runs.
+    """
+
+    def __init__(self, content, stage: str, **kwargs):
+        super().__init__(content, **kwargs)
+        self.stage = stage
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            stage_limiter.release(self.stage)
+
+
+def enforce_rate_limit(request: Request, endpoint: str, units: float = 0):
+    """
+    Charge a request to its client's bucket, rejecting it with 429 if the bucket is empty
+
+    Args:
+        request: Incoming request
+        endpoint: Endpoint name, selecting the base cost from settings.rate_limit_costs
+        units: Extra cost units (e.g. MB uploaded, results requested), charged at
+            the endpoint's per-unit cost
+    """
+    if not settings.rate_limit_enabled:
+        return
+
+    base_cost, unit_cost = settings.rate_limit_costs.get(endpoint, (1.0, 0.0))
+    cost = base_cost + units * unit_cost
+    wait = rate_limiter.acquire(client_key(request), cost)
+    if wait > 0:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded for {endpoint}. Retry in {math.ceil(wait)} seconds",
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
+
+
+# Create singleton instances
+rate_limiter = RateLimiter()
+stage_limiter = StageLimiter()
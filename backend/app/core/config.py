@@ -18,6 +18,59 @@ class Settings(BaseSettings):
     chromadb_tenant: str = "default_tenant"
     chromadb_database: str = "default_database"
     
+    # Indexing Pipeline Configuration (changing these requires python -m app.cli reindex)
+    chunk_size: int = 1000
+    chunk_overlap: int = 200
+    embedding_model: str = "all-MiniLM-L6-v2"  # Chroma default, other names use sentence-transformers
+    index_db_path: str = "data/index_state.db"  # Collection aliases
+    
+    # Answer Configuration (POST /files/ask)
+    answer_generator: str = "extractive"  # extractive, echo, or a registered generator
+    ask_n_results: int = 8  # Chunks retrieved per question
+    ask_max_context_tokens: int = 2000
+    tokenizer_encoding: str = "cl100k_base"
+    
+    # Collection Statistics Configuration
+    stats_db_path: str = "data/collection_stats.db"
+    stats_rate_window_seconds: int = 3600  # Window for ingestion rate
+    
+    # Worker Configuration
+    web_concurrency: int = 1  # Number of uvicorn worker processes (WEB_CONCURRENCY)
+    cpu_workers: int = 0  # Processes per web worker for extraction/chunking, 0 = cores / web workers
+    
+    # Shared Cache Configuration (shared by all workers on a node)
+    cache_db_path: str = "data/shared_cache.db"
+    cache_max_entries: int = 10000  # Enforced on eviction, so it can be briefly exceeded
+    cache_evict_every: int = 100  # Evict expired/excess entries every N inserts per worker
+    search_cache_ttl_seconds: int = 300  # 0 disables search result caching
+    sqlite_busy_timeout_seconds: float = 5.0
+    
+    # PDF Extraction Configuration
+    pdf_backend: str = "auto"  # auto (PyMuPDF if installed), pymupdf or pypdf2
+    pdf_min_pages_per_task: int = 8  # Smallest page range sent to one worker process
+    
+    # Rate Limiting Configuration (token bucket per API key / IP, split evenly across workers)
+    rate_limit_enabled: bool = True
+    rate_limit_capacity: float = 60.0  # Bucket size in cost units
+    rate_limit_refill_per_second: float = 1.0
+    # Endpoint -> (base cost, cost per unit); units are MB for upload, results for search/ask
+    rate_limit_costs: dict = {
+        "upload": (5.0, 2.0),
+        "search": (1.0, 0.1),
+        "ask": (3.0, 0.2),
+    }
+    # Only these X-API-Key values get their own bucket; other requests are limited per IP
+    api_keys: list = []
+    rate_limit_trust_forwarded_for: bool = False  # Only enable behind a trusted proxy
+    rate_limit_proxy_hops: int = 1  # Trusted proxies appending to X-Forwarded-For in front of the app
+    
+    # Admission Control Configuration (concurrent requests per stage, per worker)
+    extraction_concurrency: int = 4
+    search_concurrency: int = 16
+    ask_concurrency: int = 8
+    stage_queue_timeout_seconds: float = 10.0  # Wait for a slot before answering 503
+    max_n_results: int = 50
+    
     # File Upload Configuration
     max_file_size: int = 50 * 1024 * 1024  # 50MB
     allowed_file_types: list = ["pdf", "docx", "pptx", "txt"]
@@ -0,0 +1,238 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+from app.core.config import settings
+
+
+def open_sqlite(db_path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite database that several worker processes can share
+
+    WAL mode lets readers proceed while another process writes, and the busy
+    timeout makes concurrent writers wait for the lock instead of failing.
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(db_path, timeout=settings.sqlite_busy_timeout_seconds, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SharedCache:
+    """
+    SQLite-backed cache shared by all worker processes on a node.
+
+    Entries live in namespaces. Each namespace has a generation counter, and an
+    entry is only served while it was stored under the current generation, so
+    invalidate() in one process takes effect for every other process on its
+    next read. Values computed before an invalidation but stored after it are
+    never served.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.cache_db_path
+        self.max_entries = settings.cache_max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._inserts = 0
+
+    def _ensure_db(self) -> sqlite3.Connection:
+        """Ensure this process has its own connection and the tables exist"""
+        # SQLite connections must not be shared across a fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = open_sqlite(self.db_path)
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS generations (
+                    namespace TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    generation INTEGER NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                );
+                CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+            """)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _current_generation(conn: sqlite3.Connection, namespace: str) -> int:
+        row = conn.execute(
+            "SELECT generation FROM generations WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return row['generation'] if row else 0
+
+    def generation(self, namespace: str) -> int:
+        """
+        Get the current generation of a namespace
+
+        Read it before computing a value and pass it to set(), so a value that
+        raced with an invalidation is discarded.
+        """
+        with self._lock:
+            return self._current_generation(self._ensure_db(), namespace)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Get a cached value
+
+        Args:
+            namespace: Cache namespace
+            key: Entry key
+
+        Returns:
+            The cached value, or None if missing, expired or invalidated
+        """
+        with self._lock:
+            conn = self._ensure_db()
+            row = conn.execute(
+                "SELECT e.value FROM entries e "
+                "LEFT JOIN generations g ON g.namespace = e.namespace "
+                "WHERE e.namespace = ? AND e.key = ? AND e.expires_at > ? "
+                "AND e.generation = COALESCE(g.generation, 0)",
+                (namespace, key, time.time())
+            ).fetchone()
+        return json.loads(row['value']) if row else None
+
+    def set(self, namespace: str, key: str, value: Any, generation: int, ttl_seconds: int):
+        """
+        Store a value computed under the given generation
+
+        Args:
+            namespace: Cache namespace
+            key: Entry key
+            value: JSON-serializable value
+            generation: Generation read with generation() before computing value
+            ttl_seconds: Time to live
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._ensure_db()
+            with conn:
+                if generation != self._current_generation(conn, namespace):
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (namespace, key, generation, value, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, generation, json.dumps(value, ensure_ascii=False), now + ttl_seconds)
+                )
+
+                # Evict only now and then; get() already ignores expired entries
+                self._inserts += 1
+                if self._inserts % settings.cache_evict_every == 0:
+                    conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+                    conn.execute(
+                        "DELETE FROM entries WHERE rowid IN ("
+                        "SELECT rowid FROM entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+
+    def invalidate(self, namespace: str):
+        """
+        Invalidate every entry in a namespace, for all worker processes
+
+        Args:
+            namespace: Cache namespace
+        """
+        with self._lock:
+            conn = self._ensure_db()
+            with conn:
+                conn.execute(
+                    "INSERT INTO generations (namespace, generation) VALUES (?, 1) "
+                    "ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1",
+                    (namespace,)
+                )
+                conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+
+class CollectionAliases:
+    """
+    Maps a logical collection name to the ChromaDB collection currently serving it.
+
+    ChromaDB has no collection aliases, so the mapping lives in a SQLite file
+    shared by all worker processes. Switching an alias is a single-row update,
+    so every worker moves to the new collection on its next request.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.index_db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _ensure_db(self) -> sqlite3.Connection:
+        """Ensure this process has its own connection and the table exists"""
+        # SQLite connections must not be shared across a fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = open_sqlite(self.db_path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS aliases ("
+                "alias TEXT PRIMARY KEY, collection TEXT NOT NULL, switched_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def resolve(self, alias: str) -> str:
+        """
+        Get the collection an alias points to
+
+        Args:
+            alias: Logical collection name
+
+        Returns:
+            The collection name, or the alias itself if it was never switched
+        """
+        with self._lock:
+            row = self._ensure_db().execute(
+                "SELECT collection FROM aliases WHERE alias = ?", (alias,)
+            ).fetchone()
+        return row['collection'] if row else alias
+
+    def switch(self, alias: str, collection: str) -> str:
+        """
+        Atomically point an alias at another collection
+
+        Args:
+            alias: Logical collection name
+            collection: Collection that should serve the alias from now on
+
+        Returns:
+            The collection the alias pointed to before
+        """
+        with self._lock:
+            conn = self._ensure_db()
+            # Take the write lock before reading, so concurrent switches cannot both see the same previous collection
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT collection FROM aliases WHERE alias = ?", (alias,)
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO aliases (alias, collection, switched_at) VALUES (?, ?, ?)",
+                    (alias, collection, time.time())
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return row['collection'] if row else alias
+
+
+# Create singleton instances
+shared_cache = SharedCache()
+collection_aliases = CollectionAliases()
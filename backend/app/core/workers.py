@@ -0,0 +1,52 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+from app.core.config import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_cpu_workers() -> int:
+    """
+    Number of processes in this web worker's CPU pool.
+
+    When not configured, the machine's cores are split evenly between the
+    web workers so running several of them does not oversubscribe the node.
+    """
+    if settings.cpu_workers > 0:
+        return settings.cpu_workers
+    return max(1, (os.cpu_count() or 1) // max(1, settings.web_concurrency))
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Get the process pool for CPU-bound stages, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=get_cpu_workers())
+    return _executor
+
+
+async def run_cpu_bound(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a CPU-bound function in the process pool without blocking the event loop
+
+    Args:
+        func: Module-level (picklable) function to run
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown_executor():
+    """Shut down the process pool, waiting for running jobs to finish"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
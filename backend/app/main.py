@@ -1,7 +1,11 @@
+import os
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router as api_router
 from app.core.config import settings
+from app.core.workers import shutdown_executor
+from app.services.answer_service import answer_service
 
 app = FastAPI(
     title=settings.app_name, 
@@ -20,6 +24,15 @@ app.add_middleware(
 
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("startup")
+async def startup():
+    # Load the tokenizer before the first /ask, off the event loop
+    await run_in_threadpool(answer_service.token_counter.load)
+
+@app.on_event("shutdown")
+def shutdown():
+    shutdown_executor()
+
 @app.get("/")
 def read_root():
     return {
@@ -36,4 +49,4 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "service": settings.app_name} 
\ No newline at end of file
+    return {"status": "healthy", "service": settings.app_name, "worker_pid": os.getpid()} 
\ No newline at end of file
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from app.core.config import settings
 
 
 class FileUploadResponse(BaseModel):
@@ -21,12 +22,20 @@ class FileInfo(BaseModel):
     size: int
     last_modified: str
     content_type: Optional[str] = None
+    content_hash: Optional[str] = None
 
 
 class SearchRequest(BaseModel):
     """Request model for document search"""
     query: str
-    n_results: int = 5
+    n_results: int = Field(5, ge=1, le=settings.max_n_results)
+
+
+class AskRequest(BaseModel):
+    """Request model for answering a question from the documents"""
+    question: str
+    n_results: Optional[int] = Field(None, ge=1, le=settings.max_n_results)
+    max_context_tokens: Optional[int] = Field(None, ge=1)
 
 
 class SearchResult(BaseModel):
@@ -47,8 +56,16 @@ class SearchResponse(BaseModel):
 class VectorDocument(BaseModel):
     """Model for vector database documents"""
     id: str
-    text: str
-    metadata: Dict[str, Any]
+    text: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+class DocumentListResponse(BaseModel):
+    """Response model for a page of vector database documents"""
+    documents: List[VectorDocument]
+    offset: int
+    limit: int
+    next_offset: Optional[int] = None
 
 
 class CollectionInfo(BaseModel):
@@ -58,6 +75,41 @@ class CollectionInfo(BaseModel):
     created_at: str
 
 
+class ContentTypeStats(BaseModel):
+    """Model for per-content-type statistics"""
+    files: int
+    chunks: int
+    bytes: int
+
+
+class FileStats(BaseModel):
+    """Model for per-file statistics"""
+    content_type: str
+    chunks: int
+    bytes: int
+    first_indexed_at: str
+
+
+class IngestionRate(BaseModel):
+    """Model for recent ingestion throughput"""
+    window_seconds: int
+    chunks_per_minute: float
+    bytes_per_minute: float
+
+
+class CollectionStats(BaseModel):
+    """Model for incrementally maintained collection statistics"""
+    collection_name: str
+    created_at: str
+    rebuilt_at: Optional[str] = None
+    total_files: int
+    total_chunks: int
+    total_bytes: int
+    by_content_type: Dict[str, ContentTypeStats]
+    ingestion_rate: IngestionRate
+    files: Optional[Dict[str, FileStats]] = None
+
+
 class DeleteRequest(BaseModel):
     """Request model for deleting documents"""
     document_ids: List[str]
@@ -0,0 +1,320 @@
+import json
+import re
+import time
+import tiktoken
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Dict, Any, AsyncIterator, Optional
+from app.core.config import settings
+from app.services.vector_service import vector_service
+
+SEGMENT_KEYS = ["page", "slide", "section"]
+
+# Shortest text match accepted as the overlap of chunks without character offsets
+MIN_OVERLAP = 20
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken, falling back to ~4 characters per token"""
+
+    def __init__(self, encoding_name: Optional[str] = None):
+        self.encoding_name = encoding_name or settings.tokenizer_encoding
+        self._encoding = None
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self):
+        """
+        Load the encoding, which tiktoken downloads on first use
+
+        Blocking; call it from a thread (see AnswerService.prepare) or at startup.
+        """
+        self._get_encoding()
+
+    def _get_encoding(self):
+        if not self._loaded:
+            self._loaded = True
+            try:
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                # The encoding is downloaded on first use, which fails offline
+                print(f"Falling back to approximate token counts: {str(e)}")
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is not None:
+            # encode() rejects text that looks like special tokens, e.g. "<|endoftext|>"
+            return len(encoding.encode_ordinary(text))
+        return (len(text) + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most max_tokens tokens"""
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return encoding.decode(encoding.encode_ordinary(text)[:max_tokens])
+        return text[:max_tokens * 4]
+
+
+class AnswerGenerator:
+    """Base class for answer generators; subclasses stream answer text pieces"""
+
+    def stream(self, question: str, passages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+class ExtractiveGenerator(AnswerGenerator):
+    """
+    Local stand-in for an LLM: answers with the context sentences that share
+    the most words with the question, streamed word by word
+    """
+
+    max_sentences = 3
+
+    async def stream(self, question: str, passages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        question_words = set(re.findall(r"\w+", question.lower()))
+        sentences = [
+            sentence.strip()
+            for passage in passages
+            for sentence in re.split(r"(?<=[.!?])\s+|\n+", passage['text'])
+            if sentence.strip()
+        ]
+        scored = [
+            (len(question_words & set(re.findall(r"\w+", sentence.lower()))), i)
+            for i, sentence in enumerate(sentences)
+        ]
+        best = sorted(i for score, i in sorted(scored, reverse=True)[:self.max_sentences] if score > 0)
+        if not best:
+            best = list(range(min(self.max_sentences, len(sentences))))
+
+        for i in best:
+            for word in sentences[i].split():
+                yield word + " "
+
+
+class EchoGenerator(AnswerGenerator):
+    """Streams the packed context back unchanged; useful for testing the pipeline"""
+
+    async def stream(self, question: str, passages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        for passage in passages:
+            yield passage['text'] + "\n\n"
+
+
+GENERATORS = {
+    "extractive": ExtractiveGenerator,
+    "echo": EchoGenerator,
+}
+
+
+def register_generator(name: str, generator_class: type):
+    """Make an AnswerGenerator subclass selectable with settings.answer_generator"""
+    GENERATORS[name] = generator_class
+
+
+def _join_overlapping(first: str, second: str, max_overlap: int) -> str:
+    """
+    Join consecutive chunks indexed without character offsets, dropping the text they share
+
+    An overlap shorter than MIN_OVERLAP is treated as a coincidence, so
+    unrelated chunks are not glued together on a matching letter or word.
+    """
+    for size in range(min(len(first), len(second), max_overlap), MIN_OVERLAP - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + "\n" + second
+
+
+def _sse(event: str, data: Any) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class AnswerService:
+    # Smallest excerpt of an overflowing passage worth including
+    min_excerpt_tokens = 64
+
+    def __init__(self):
+        self.token_counter = TokenCounter()
+
+    def merge_chunks(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Deduplicate search results and merge consecutive chunks of the same file
+
+        Consecutive chunks (by chunk_index) overlap by up to chunk_overlap
+        characters; merging them avoids sending that text twice. The overlap
+        comes from the chunks' char_start offsets, or for chunks indexed
+        without them, from matching their text.
+
+        Args:
+            results: Search results with 'text', 'metadata' and 'distance'
+
+        Returns:
+            Passages ordered by their best distance
+        """
+        by_file: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        for result in results:
+            metadata = result['metadata'] or {}
+            chunks = by_file.setdefault(metadata.get('filename', result.get('id')), {})
+            chunk_index = metadata.get('chunk_index', len(chunks))
+            if chunk_index not in chunks:
+                chunks[chunk_index] = result
+
+        passages = []
+        for filename, chunks in by_file.items():
+            passage = None
+            char_end = None
+            for chunk_index in sorted(chunks):
+                result = chunks[chunk_index]
+                metadata = result['metadata'] or {}
+                distance = result.get('distance')
+                char_start = metadata.get('char_start')
+                if passage is not None and chunk_index == passage['chunk_end'] + 1:
+                    if char_end is not None and char_start is not None:
+                        # Offsets in the extracted text give the exact overlap
+                        overlap = char_end - char_start
+                        if overlap <= 0:
+                            passage['text'] += "\n" + result['text']
+                        else:
+                            passage['text'] += result['text'][overlap:]
+                    else:
+                        passage['text'] = _join_overlapping(
+                            passage['text'], result['text'], settings.chunk_overlap
+                        )
+                    passage['chunk_end'] = chunk_index
+                    if char_end is not None and char_start is not None:
+                        char_end = max(char_end, char_start + len(result['text']))
+                    else:
+                        char_end = None
+                    for key in SEGMENT_KEYS:
+                        if f'{key}_end' in metadata:
+                            passage[f'{key}_end'] = metadata[f'{key}_end']
+                    if distance is not None and (passage['distance'] is None or distance < passage['distance']):
+                        passage['distance'] = distance
+                    continue
+
+                passage = {
+                    'filename': filename,
+                    'original_filename': metadata.get('original_filename'),
+                    'chunk_start': chunk_index,
+                    'chunk_end': chunk_index,
+                    'distance': distance,
+                    'text': result['text']
+                }
+                char_end = char_start + len(result['text']) if char_start is not None else None
+                for key in SEGMENT_KEYS:
+                    if f'{key}_start' in metadata:
+                        passage[f'{key}_start'] = metadata[f'{key}_start']
+                        passage[f'{key}_end'] = metadata[f'{key}_end']
+                passages.append(passage)
+
+        return sorted(passages, key=lambda p: p['distance'] if p['distance'] is not None else float('inf'))
+
+    def pack_context(self, passages: List[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
+        """
+        Keep the best passages that fit in the token budget
+
+        Passages are taken in relevance order. One that does not fit is cut
+        to the remaining budget, marked 'truncated', so a long merged run of
+        the best chunks is shortened rather than dropped. When too little of
+        the budget is left for a useful excerpt, the passage is skipped so
+        smaller, less relevant passages can still fill it.
+
+        Args:
+            passages: Passages ordered by relevance
+            max_tokens: Context token budget
+
+        Returns:
+            Packed passages, each with its token count
+        """
+        packed = []
+        used = 0
+        for passage in passages:
+            remaining = max_tokens - used
+            if remaining <= 0:
+                break
+            tokens = self.token_counter.count(passage['text'])
+            if tokens <= remaining:
+                packed.append({**passage, 'tokens': tokens})
+                used += tokens
+                continue
+
+            # An empty context is never better than an excerpt
+            if remaining < self.min_excerpt_tokens and packed:
+                continue
+            text = self.token_counter.truncate(passage['text'], remaining)
+            tokens = self.token_counter.count(text)
+            packed.append({**passage, 'text': text, 'tokens': tokens, 'truncated': True})
+            used += tokens
+        return packed
+    
+    async def prepare(self, question: str, n_results: int, max_tokens: int) -> List[Dict[str, Any]]:
+        """
+        Retrieve, deduplicate and pack the context for a question
+
+        Args:
+            question: User question
+            n_results: Number of chunks to retrieve
+            max_tokens: Context token budget
+
+        Returns:
+            Packed passages
+        """
+        if not self.token_counter.loaded:
+            # Keep a slow or failing encoding download off the event loop
+            await run_in_threadpool(self.token_counter.load)
+        results = await vector_service.search_documents(question, n_results)
+        return self.pack_context(self.merge_chunks(results), max_tokens)
+
+    def get_generator(self) -> AnswerGenerator:
+        """Create the configured answer generator"""
+        if settings.answer_generator not in GENERATORS:
+            raise ValueError(
+                f"Unknown answer generator: {settings.answer_generator}. "
+                f"Available generators: {list(GENERATORS)}"
+            )
+        return GENERATORS[settings.answer_generator]()
+    
+    async def stream_answer(self, question: str, passages: List[Dict[str, Any]], generator: AnswerGenerator,
+                            started: float, retrieval_ms: float) -> AsyncIterator[str]:
+        """
+        Stream the answer as Server-Sent Events
+
+        Emits a 'context' event with the sources, 'token' events with answer
+        text, then a 'done' event with timings. Time to first byte counts from
+        request start to the first answer token.
+
+        Args:
+            question: User question
+            passages: Packed context passages
+            generator: Answer generator to stream from
+            started: time.perf_counter() at request start
+            retrieval_ms: Time spent retrieving and packing context
+        """
+        yield _sse("context", {
+            "sources": [{k: v for k, v in passage.items() if k != 'text'} for passage in passages],
+            "context_tokens": sum(passage['tokens'] for passage in passages)
+        })
+
+        ttfb_ms = None
+        try:
+            async for piece in generator.stream(question, passages):
+                if ttfb_ms is None:
+                    ttfb_ms = (time.perf_counter() - started) * 1000
+                yield _sse("token", {"text": piece})
+        except Exception as e:
+            print(f"Error generating answer: {str(e)}")
+            yield _sse("error", {"detail": f"Answer generation failed: {str(e)}"})
+
+        total_ms = (time.perf_counter() - started) * 1000
+        print(f"Answered in {total_ms:.0f}ms (ttfb {ttfb_ms or total_ms:.0f}ms, retrieval {retrieval_ms:.0f}ms)")
+        yield _sse("done", {
+            "retrieval_ms": retrieval_ms,
+            "ttfb_ms": ttfb_ms,
+            "total_ms": total_ms
+        })
+
+
+# Create a singleton instance
+answer_service = AnswerService()
@@ -1,22 +1,119 @@
 import PyPDF2
-from docx import Document
-from pptx import Presentation
 import io
-from typing import List, Dict, Any
+import os
+import asyncio
+import tempfile
+from bisect import bisect_right
+from typing import List, Dict, Any, Optional, Tuple, Union
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from app.core.config import settings
+from app.core.workers import run_cpu_bound, get_cpu_workers
+from app.services.ooxml_parser import extract_docx_sections, extract_pptx_slides
+
+try:
+    import fitz  # PyMuPDF, optional faster PDF backend
+except ImportError:
+    fitz = None
+
+PDF_BACKENDS = ["pymupdf", "pypdf2"]
+
+# Bump when extraction output changes, so reindexing reprocesses every file
+EXTRACTION_VERSION = 4
+
+
+def get_pipeline_version(file_type: Optional[str] = None) -> str:
+    """
+    Identify the extraction and chunking configuration that produced a chunk
+
+    Stored in chunk metadata; reindexing reprocesses files whose chunks carry
+    a different version. PDFs also record the backend that extracted them,
+    since PyMuPDF and PyPDF2 produce different text.
+
+    Args:
+        file_type: File extension of the processed file
+    """
+    version = f"x{EXTRACTION_VERSION}-c{settings.chunk_size}-o{settings.chunk_overlap}"
+    if file_type == "pdf":
+        version += f"-{resolve_pdf_backend()}"
+    return version
+
+
+def resolve_pdf_backend(backend: Optional[str] = None) -> str:
+    """
+    Resolve the configured PDF backend, preferring PyMuPDF when installed
+    
+    Args:
+        backend: 'auto', 'pymupdf' or 'pypdf2' (defaults to settings.pdf_backend)
+    
+    Returns:
+        Name of the backend to use
+    """
+    backend = (backend or settings.pdf_backend).lower()
+    if backend == "auto":
+        return "pymupdf" if fitz is not None else "pypdf2"
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend: {backend}. Available backends: {PDF_BACKENDS}")
+    if backend == "pymupdf" and fitz is None:
+        raise ValueError("PDF backend 'pymupdf' requested but PyMuPDF is not installed")
+    return backend
+
+
+def count_pdf_pages(source: Union[bytes, str], backend: str) -> int:
+    """Count the pages of a PDF given as bytes or a file path"""
+    if backend == "pymupdf":
+        with _open_fitz(source) as doc:
+            return doc.page_count
+    return len(_open_pypdf2(source).pages)
+
+
+def extract_pdf_pages(source: Union[bytes, str], start: int, end: int, backend: str) -> List[str]:
+    """
+    Extract the text of pages [start, end) of a PDF given as bytes or a file path
+    
+    Module-level so it can run in the CPU worker pool, where it is given a
+    path so the PDF is not pickled to every task. PyMuPDF sorts text blocks
+    into reading order, which keeps multi-column layouts readable.
+    """
+    if backend == "pymupdf":
+        with _open_fitz(source) as doc:
+            return [doc[i].get_text("text", sort=True) for i in range(start, end)]
+    pdf_reader = _open_pypdf2(source)
+    return [pdf_reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _open_fitz(source: Union[bytes, str]):
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _open_pypdf2(source: Union[bytes, str]) -> PyPDF2.PdfReader:
+    return PyPDF2.PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+
+
+def _spool_pdf(file_content: bytes, backend: str) -> Tuple[str, int]:
+    """Write a PDF to a temporary file for the worker pool and count its pages"""
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(file_content)
+    try:
+        return f.name, count_pdf_pages(file_content, backend)
+    except Exception:
+        os.remove(f.name)
+        raise
 
 
 class DocumentService:
     def __init__(self):
+        self.chunk_size = settings.chunk_size
+        self.chunk_overlap = settings.chunk_overlap
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
     
-    async def extract_text_from_file(self, file_content: bytes, file_type: str) -> str:
+    def extract_text_from_file(self, file_content: bytes, file_type: str) -> str:
         """
         Extract text from different file types
         
@@ -27,57 +124,94 @@ class DocumentService:
         Returns:
             Extracted text
         """
+        segments, _ = self.extract_segments_from_file(file_content, file_type)
+        return "\n".join(segments).strip()
+    
+    def extract_segments_from_file(self, file_content: bytes, file_type: str) -> Tuple[List[str], Optional[str]]:
+        """
+        Extract text from different file types, split into numbered segments
+        
+        Args:
+            file_content: File content as bytes
+            file_type: File extension (pdf, docx, pptx, txt)
+        
+        Returns:
+            Tuple of (segment texts, segment key). Segment i is number i + 1 of
+            the segment key (e.g. 'page'); the key is None for unsegmented files.
+        """
         try:
             if file_type.lower() == 'pdf':
-                return await self._extract_from_pdf(file_content)
+                return self._extract_from_pdf(file_content), 'page'
             elif file_type.lower() == 'docx':
-                return await self._extract_from_docx(file_content)
+                return self._extract_from_docx(file_content), 'section'
             elif file_type.lower() == 'pptx':
-                return await self._extract_from_pptx(file_content)
+                return self._extract_from_pptx(file_content), 'slide'
             elif file_type.lower() == 'txt':
-                return await self._extract_from_txt(file_content)
+                return [self._extract_from_txt(file_content)], None
             else:
                 raise ValueError(f"Unsupported file type: {file_type}")
                 
         except Exception as e:
             raise Exception(f"Failed to extract text from {file_type} file: {str(e)}")
     
-    async def _extract_from_pdf(self, file_content: bytes) -> str:
-        """Extract text from PDF file"""
+    def _extract_from_pdf(self, file_content: bytes) -> List[str]:
+        """Extract text from PDF file, one entry per page"""
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            backend = resolve_pdf_backend()
+            return extract_pdf_pages(file_content, 0, count_pdf_pages(file_content, backend), backend)
         except Exception as e:
             raise Exception(f"PDF extraction failed: {str(e)}")
     
-    async def _extract_from_docx(self, file_content: bytes) -> str:
-        """Extract text from DOCX file"""
+    async def extract_pdf_pages_parallel(self, file_content: bytes, backend: Optional[str] = None) -> List[str]:
+        """
+        Extract text from PDF file with page ranges fanned out across the CPU worker pool
+        
+        Args:
+            file_content: File content as bytes
+            backend: PDF backend to use (defaults to settings.pdf_backend)
+        
+        Returns:
+            List of page texts, in page order
+        """
         try:
-            doc = Document(io.BytesIO(file_content))
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
+            backend = resolve_pdf_backend(backend)
+            # Counting pages is cheap; workers get a file path rather than
+            # the PDF bytes, so large PDFs are not piped to every task
+            path, page_count = await asyncio.to_thread(_spool_pdf, file_content, backend)
+            try:
+                # Enough ranges to keep every pool process busy, but not so small
+                # that re-opening the PDF in each task dominates
+                pages_per_task = max(settings.pdf_min_pages_per_task, -(-page_count // get_cpu_workers()))
+                tasks = [
+                    run_cpu_bound(extract_pdf_pages, path, start,
+                                  min(start + pages_per_task, page_count), backend)
+                    for start in range(0, page_count, pages_per_task)
+                ]
+                
+                pages = []
+                for page_range in await asyncio.gather(*tasks):
+                    pages.extend(page_range)
+                return pages
+            finally:
+                os.remove(path)
+        except Exception as e:
+            raise Exception(f"PDF extraction failed: {str(e)}")
+    
+    def _extract_from_docx(self, file_content: bytes) -> List[str]:
+        """Extract text from DOCX file, including tables, one entry per section"""
+        try:
+            return extract_docx_sections(file_content)
         except Exception as e:
             raise Exception(f"DOCX extraction failed: {str(e)}")
     
-    async def _extract_from_pptx(self, file_content: bytes) -> str:
-        """Extract text from PPTX file"""
+    def _extract_from_pptx(self, file_content: bytes) -> List[str]:
+        """Extract text from PPTX file, including tables, group shapes and notes, one entry per slide"""
         try:
-            prs = Presentation(io.BytesIO(file_content))
-            text = ""
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text += shape.text + "\n"
-            return text.strip()
+            return extract_pptx_slides(file_content)
         except Exception as e:
             raise Exception(f"PPTX extraction failed: {str(e)}")
     
-    async def _extract_from_txt(self, file_content: bytes) -> str:
+    def _extract_from_txt(self, file_content: bytes) -> str:
         """Extract text from TXT file"""
         try:
             return file_content.decode('utf-8').strip()
@@ -85,13 +219,17 @@ class DocumentService:
             # Try with different encoding
             return file_content.decode('latin-1').strip()
     
-    async def chunk_text(self, text: str, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def chunk_text(self, text: str, metadata: Dict[str, Any],
+                   segment_starts: Optional[List[int]] = None,
+                   segment_key: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Split text into chunks for vector storage
         
         Args:
             text: Text to chunk
             metadata: Metadata to attach to each chunk
+            segment_starts: Sorted character offsets where each segment (e.g. page) starts
+            segment_key: Segment name; chunks get '<key>_start' and '<key>_end' metadata
         
         Returns:
             List of text chunks with metadata
@@ -102,14 +240,32 @@ class DocumentService:
             
             # Create documents with metadata
             documents = []
+            index, previous_length = 0, 0
             for i, chunk in enumerate(chunks):
                 chunk_metadata = metadata.copy()
                 chunk_metadata.update({
                     'chunk_index': i,
                     'total_chunks': len(chunks),
-                    'chunk_size': len(chunk)
+                    'chunk_size': len(chunk),
+                    # Lets deletions update the byte statistics without fetching texts
+                    'chunk_bytes': len(chunk.encode('utf-8'))
                 })
                 
+                # Locate the chunk in the text; consecutive chunks overlap by at most chunk_overlap
+                search_from = max(0, index + previous_length - self.chunk_overlap)
+                found = text.find(chunk, search_from)
+                index = found if found >= 0 else search_from
+                previous_length = len(chunk)
+                if found >= 0:
+                    # Lets consecutive chunks be merged exactly on their overlap
+                    chunk_metadata['char_start'] = found
+                
+                if segment_starts and segment_key:
+                    chunk_metadata.update({
+                        f'{segment_key}_start': bisect_right(segment_starts, index),
+                        f'{segment_key}_end': bisect_right(segment_starts, index + max(len(chunk) - 1, 0))
+                    })
+                
                 documents.append({
                     'text': chunk,
                     'metadata': chunk_metadata
@@ -120,7 +276,32 @@ class DocumentService:
         except Exception as e:
             raise Exception(f"Failed to chunk text: {str(e)}")
     
-    async def process_file(self, file_content: bytes, file_type: str, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def chunk_segments(self, segments: List[str], metadata: Dict[str, Any],
+                       segment_key: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Join extracted segments and chunk them, recording which segments each chunk spans
+        
+        Args:
+            segments: Segment texts in order
+            metadata: File metadata
+            segment_key: Segment name (e.g. 'page'), or None for unsegmented text
+        
+        Returns:
+            List of text chunks with metadata
+        """
+        segment_starts = []
+        offset = 0
+        for segment in segments:
+            segment_starts.append(offset)
+            offset += len(segment) + 1  # Joined with a newline
+        text = "\n".join(segments)
+        
+        # Add text length to metadata
+        metadata['text_length'] = len(text.strip())
+        
+        return self.chunk_text(text, metadata, segment_starts, segment_key)
+    
+    def process_file_sync(self, file_content: bytes, file_type: str, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Complete file processing pipeline: extract text and chunk it
         
@@ -134,19 +315,48 @@ class DocumentService:
         """
         try:
             # Extract text from file
-            text = await self.extract_text_from_file(file_content, file_type)
-            
-            # Add text length to metadata
-            metadata['text_length'] = len(text)
+            segments, segment_key = self.extract_segments_from_file(file_content, file_type)
             
             # Chunk the text
-            chunks = await self.chunk_text(text, metadata)
-            
-            return chunks
+            return self.chunk_segments(segments, metadata, segment_key)
             
         except Exception as e:
             raise Exception(f"File processing failed: {str(e)}")
+    
+    async def process_file(self, file_content: bytes, file_type: str, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Run the file processing pipeline in the CPU worker pool so extraction
+        and chunking do not block the event loop. PDF pages are extracted in
+        parallel across the pool.
+        
+        Args:
+            file_content: File content as bytes
+            file_type: File extension
+            metadata: File metadata
+        
+        Returns:
+            List of text chunks with metadata
+        """
+        if file_type.lower() != 'pdf':
+            return await run_cpu_bound(_process_file, file_content, file_type, metadata)
+        
+        try:
+            pages = await self.extract_pdf_pages_parallel(file_content)
+            return await run_cpu_bound(_chunk_segments, pages, metadata, 'page')
+        except Exception as e:
+            raise Exception(f"File processing failed: {str(e)}")
 
 
 # Create a singleton instance
-document_service = DocumentService() 
\ No newline at end of file
+document_service = DocumentService()
+
+
+def _process_file(file_content: bytes, file_type: str, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Process a file with the worker process's own DocumentService instance"""
+    return document_service.process_file_sync(file_content, file_type, metadata)
+
+
+def _chunk_segments(segments: List[str], metadata: Dict[str, Any], segment_key: Optional[str]) -> List[Dict[str, Any]]:
+    """Chunk extracted segments with the worker process's own DocumentService instance"""
+    return document_service.chunk_segments(segments, metadata, segment_key)
+ 
\ No newline at end of file
@@ -0,0 +1,296 @@
+import io
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import List, Dict, IO
+
+# OOXML namespaces
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+NOTES_SLIDE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+
+
+def _tag(ns: str, name: str) -> str:
+    return f"{{{ns}}}{name}"
+
+
+def _rows_to_text(rows: List[List[str]]) -> str:
+    """Render table rows one per line with cells separated by ' | '"""
+    return "\n".join(" | ".join(cell for cell in row) for row in rows if any(row))
+
+
+class _TextCollector:
+    """
+    Shared iterparse state for WordprocessingML and DrawingML text.
+
+    Paragraph text is accumulated run by run; paragraphs inside table cells
+    are gathered into rows instead of being emitted directly, so tables come
+    out as ' | '-separated lines. Nested tables are flattened into their cell.
+    """
+
+    def __init__(self):
+        self.paragraph: List[str] = []
+        # One entry per open table: list of rows, each a list of cell texts
+        self.tables: List[List[List[str]]] = []
+        self.cells: List[List[str]] = []
+        # Text of text boxes anchored in the current paragraph, emitted after it
+        self.anchored: List[str] = []
+
+    def add_paragraph(self, lines: List[str]):
+        """Finish the current paragraph, into the open cell or the output"""
+        text = "".join(self.paragraph)
+        self.paragraph = []
+        if self.cells:
+            self.cells[-1].append(text)
+            self.cells[-1].extend(self.anchored)
+        else:
+            if text.strip():
+                lines.append(text)
+            lines.extend(self.anchored)
+        self.anchored = []
+
+    def start_table(self):
+        self.tables.append([])
+
+    def start_row(self):
+        if self.tables:
+            self.tables[-1].append([])
+
+    def start_cell(self):
+        self.cells.append([])
+
+    def end_cell(self):
+        cell = self.cells.pop()
+        if self.tables and self.tables[-1]:
+            self.tables[-1][-1].append(" ".join(p.strip() for p in cell if p.strip()))
+
+    def end_table(self, lines: List[str]):
+        text = _rows_to_text(self.tables.pop())
+        if not text:
+            return
+        if self.cells:
+            # Nested table: keep its text inside the enclosing cell
+            self.cells[-1].append(text.replace("\n", " "))
+        else:
+            lines.append(text)
+
+
+def extract_docx_sections(file_content: bytes) -> List[str]:
+    """
+    Extract text from a DOCX file by streaming word/document.xml
+
+    Paragraphs and tables are read in document order. A paragraph carrying
+    w:sectPr ends a document section, so the result has one entry per section.
+    Text boxes are collected separately and follow the paragraph they are
+    anchored in; their mc:Fallback (VML) copies are skipped.
+
+    Args:
+        file_content: File content as bytes
+
+    Returns:
+        List of section texts, in order
+    """
+    p, t, tab, br, cr = (_tag(W_NS, n) for n in ("p", "t", "tab", "br", "cr"))
+    tbl, tr, tc, sect_pr = (_tag(W_NS, n) for n in ("tbl", "tr", "tc", "sectPr"))
+    txbx_content, fallback = _tag(W_NS, "txbxContent"), _tag(MC_NS, "Fallback")
+
+    sections: List[str] = []
+    lines: List[str] = []
+    # One collector and output list per open text box, on top of the body's
+    collectors = [_TextCollector()]
+    outputs = [lines]
+    depth = 0
+    paragraph_depth = 0
+    fallback_depth = 0
+    ends_section = False
+
+    with zipfile.ZipFile(io.BytesIO(file_content)) as archive:
+        with archive.open("word/document.xml") as part:
+            for event, elem in ET.iterparse(part, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if elem.tag == fallback:
+                        fallback_depth += 1
+                    if fallback_depth:
+                        continue
+                    collector = collectors[-1]
+                    if elem.tag == p:
+                        paragraph_depth += 1
+                    elif elem.tag == sect_pr and paragraph_depth:
+                        ends_section = True
+                    elif elem.tag == txbx_content:
+                        collectors.append(_TextCollector())
+                        outputs.append([])
+                    elif elem.tag == tbl:
+                        collector.start_table()
+                    elif elem.tag == tr:
+                        collector.start_row()
+                    elif elem.tag == tc:
+                        collector.start_cell()
+                    continue
+
+                depth -= 1
+                if fallback_depth:
+                    if elem.tag == fallback:
+                        fallback_depth -= 1
+                        elem.clear()
+                    continue
+
+                collector = collectors[-1]
+                if elem.tag == t:
+                    collector.paragraph.append(elem.text or "")
+                elif elem.tag == tab:
+                    collector.paragraph.append("\t")
+                elif elem.tag in (br, cr):
+                    collector.paragraph.append("\n")
+                elif elem.tag == p:
+                    paragraph_depth -= 1
+                    collector.add_paragraph(outputs[-1])
+                    if ends_section and not paragraph_depth:
+                        sections.append("\n".join(lines))
+                        lines = outputs[0] = []
+                        ends_section = False
+                elif elem.tag == txbx_content:
+                    collectors.pop()
+                    collectors[-1].anchored.extend(outputs.pop())
+                elif elem.tag == tc:
+                    collector.end_cell()
+                elif elem.tag == tbl:
+                    collector.end_table(outputs[-1])
+
+                # Drop finished body-level blocks to keep memory flat
+                if depth == 2:
+                    elem.clear()
+
+    if lines or not sections:
+        sections.append("\n".join(lines))
+    return sections
+
+
+def _read_rels(archive: zipfile.ZipFile, part_name: str) -> Dict[str, Dict[str, str]]:
+    """Read the relationships of a package part, keyed by relationship id"""
+    directory, filename = posixpath.split(part_name)
+    rels_name = posixpath.join(directory, "_rels", f"{filename}.rels")
+    if rels_name not in archive.namelist():
+        return {}
+
+    rels = {}
+    with archive.open(rels_name) as part:
+        for _, elem in ET.iterparse(part):
+            if elem.tag == _tag(PKG_REL_NS, "Relationship"):
+                target = elem.get("Target", "")
+                if elem.get("TargetMode") != "External":
+                    # Absolute part names start at the package root
+                    if target.startswith("/"):
+                        target = posixpath.normpath(target.lstrip("/"))
+                    else:
+                        target = posixpath.normpath(posixpath.join(directory, target))
+                rels[elem.get("Id")] = {"type": elem.get("Type", ""), "target": target}
+    return rels
+
+
+def _extract_drawingml_text(part: IO[bytes], body_placeholders_only: bool = False) -> List[str]:
+    """
+    Stream the text of a slide or notes part
+
+    Walks every shape, including shapes nested in group shapes, and tables
+    in graphic frames.
+
+    Args:
+        part: Open slide or notes XML part
+        body_placeholders_only: Only keep text of body placeholders, which for
+            notes slides skips the slide image and slide number placeholders
+    """
+    ap, at, abr = (_tag(A_NS, n) for n in ("p", "t", "br"))
+    tbl, tr, tc = (_tag(A_NS, n) for n in ("tbl", "tr", "tc"))
+    sp, ph = _tag(P_NS, "sp"), _tag(P_NS, "ph")
+
+    lines: List[str] = []
+    collector = _TextCollector()
+    placeholder_type = None
+    fallback = _tag(MC_NS, "Fallback")
+    fallback_depth = 0
+
+    for event, elem in ET.iterparse(part, events=("start", "end")):
+        # mc:Fallback repeats the content of mc:Choice for older readers
+        if elem.tag == fallback:
+            fallback_depth += 1 if event == "start" else -1
+            continue
+        if fallback_depth:
+            continue
+
+        if event == "start":
+            if elem.tag == sp:
+                placeholder_type = None
+            elif elem.tag == ph:
+                placeholder_type = elem.get("type", "body")
+            elif elem.tag == tbl:
+                collector.start_table()
+            elif elem.tag == tr:
+                collector.start_row()
+            elif elem.tag == tc:
+                collector.start_cell()
+            continue
+
+        if elem.tag == at:
+            collector.paragraph.append(elem.text or "")
+        elif elem.tag == abr:
+            collector.paragraph.append("\n")
+        elif elem.tag == ap:
+            if body_placeholders_only and placeholder_type != "body":
+                collector.paragraph = []
+            else:
+                collector.add_paragraph(lines)
+            elem.clear()
+        elif elem.tag == tc:
+            collector.end_cell()
+        elif elem.tag == tbl:
+            collector.end_table(lines)
+        elif elem.tag == sp:
+            elem.clear()
+
+    return lines
+
+
+def extract_pptx_slides(file_content: bytes) -> List[str]:
+    """
+    Extract text from a PPTX file by streaming each slide part in presentation order
+
+    Each slide's text includes group shapes, tables and its speaker notes.
+
+    Args:
+        file_content: File content as bytes
+
+    Returns:
+        List of slide texts, in order
+    """
+    presentation_part = "ppt/presentation.xml"
+    sld_id = _tag(P_NS, "sldId")
+    rel_id = _tag(R_NS, "id")
+
+    slides: List[str] = []
+    with zipfile.ZipFile(io.BytesIO(file_content)) as archive:
+        presentation_rels = _read_rels(archive, presentation_part)
+
+        slide_parts = []
+        with archive.open(presentation_part) as part:
+            for _, elem in ET.iterparse(part):
+                if elem.tag == sld_id and elem.get(rel_id) in presentation_rels:
+                    slide_parts.append(presentation_rels[elem.get(rel_id)]["target"])
+
+        for slide_part in slide_parts:
+            with archive.open(slide_part) as part:
+                lines = _extract_drawingml_text(part)
+
+            for rel in _read_rels(archive, slide_part).values():
+                if rel["type"] == NOTES_SLIDE_REL and rel["target"] in archive.namelist():
+                    with archive.open(rel["target"]) as part:
+                        lines.extend(_extract_drawingml_text(part, body_placeholders_only=True))
+
+            slides.append("\n".join(lines))
+
+    return slides
@@ -0,0 +1,252 @@
+import fcntl
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from app.core.config import settings
+from app.services.storage_service import storage_service
+from app.services.vector_service import vector_service, DEFAULT_EMBEDDING_MODEL
+from app.services.document_service import document_service, get_pipeline_version
+
+
+@contextmanager
+def _reindex_lock():
+    """
+    Hold the node-wide reindex lock, failing if another reindex holds it
+
+    A file lock is released by the OS when its holder exits, so a crashed
+    run never leaves the lock behind.
+    """
+    path = f"{settings.index_db_path}.reindex.lock"
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise Exception("Another reindex is already running")
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class ReindexService:
+    """
+    Brings the vector database in line with the originals in MinIO.
+
+    Only files whose content hash or pipeline version changed are processed
+    again. When the embedding model changed, or a full rebuild is requested,
+    a shadow collection is built next to the live one and the collection
+    alias is switched to it once it is complete, so search keeps serving
+    throughout.
+    """
+
+    async def _scan_indexed_files(self, collection, batch_size: int) -> Dict[str, Dict[str, Any]]:
+        """Collect chunk ids and indexing metadata per stored file, reading metadata only"""
+        indexed = {}
+        offset = 0
+        while True:
+            results = collection.get(limit=batch_size, offset=offset, include=["metadatas"])
+            for doc_id, metadata in zip(results['ids'], results['metadatas']):
+                metadata = metadata or {}
+                entry = indexed.setdefault(metadata.get('filename', 'unknown'), {
+                    'ids': [],
+                    'chunk_indexes': set(),
+                    'duplicated': False,
+                    'content_hash': metadata.get('content_hash'),
+                    'pipeline_version': metadata.get('pipeline_version'),
+                    'uploaded_at': metadata.get('uploaded_at')
+                })
+                entry['ids'].append(doc_id)
+                # A chunk index seen twice means the file was indexed twice
+                chunk_index = metadata.get('chunk_index')
+                if chunk_index in entry['chunk_indexes']:
+                    entry['duplicated'] = True
+                entry['chunk_indexes'].add(chunk_index)
+                # A file indexed partly under another version counts as changed
+                if metadata.get('pipeline_version') != entry['pipeline_version']:
+                    entry['pipeline_version'] = None
+            if len(results['ids']) < batch_size:
+                break
+            offset += batch_size
+        return indexed
+
+    @staticmethod
+    def _file_type(filename: str) -> str:
+        """File extension, as used to select the extraction path"""
+        return filename.split('.')[-1].lower() if '.' in filename else ''
+
+    def _is_current(self, file_info: Dict[str, Any], entry: Optional[Dict[str, Any]]) -> bool:
+        """Whether a file's chunks were built from its current content with the current pipeline"""
+        return (
+            entry is not None
+            and entry['content_hash'] == file_info['content_hash']
+            and entry['pipeline_version'] == get_pipeline_version(self._file_type(file_info['filename']))
+        )
+
+    async def _process_stored_file(self, file_info: Dict[str, Any],
+                                   entry: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Download a stored original and run it through the processing pipeline"""
+        filename = file_info['filename']
+        file_extension = self._file_type(filename)
+        file_content = await storage_service.get_file_content(filename)
+        metadata = {
+            'filename': filename,
+            'original_filename': file_info['original_filename'],
+            'content_type': file_info['content_type'],
+            'file_size': file_info['size'],
+            'uploaded_at': (entry or {}).get('uploaded_at') or file_info['last_modified'],
+            'content_hash': file_info['content_hash'],
+            'pipeline_version': get_pipeline_version(file_extension)
+        }
+        return await document_service.process_file(file_content, file_extension, metadata)
+
+    async def reindex(self, full: bool = False, dry_run: bool = False,
+                      keep_old: bool = False, batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Re-derive chunks from the originals in storage where they are out of date
+
+        Args:
+            full: Build a shadow collection even if the embedding model is unchanged
+            dry_run: Only report what would be done
+            keep_old: Keep the previous collection after a shadow rebuild
+            batch_size: Number of documents read from ChromaDB per request
+
+        Returns:
+            Dictionary summarizing the reindex
+        """
+        # Two runs would process the same files and race on the collection alias
+        with _reindex_lock():
+            return await self._reindex(full, dry_run, keep_old, batch_size)
+
+    async def _reindex(self, full: bool, dry_run: bool, keep_old: bool, batch_size: int) -> Dict[str, Any]:
+        started = time.perf_counter()
+        active = vector_service.get_active_collection()
+        active_model = (active.metadata or {}).get("embedding_model", DEFAULT_EMBEDDING_MODEL)
+        rebuild = full or active_model != settings.embedding_model
+
+        files = {f['filename']: f for f in await storage_service.list_files()}
+        indexed = await self._scan_indexed_files(active, batch_size)
+        changed = [
+            name for name, info in files.items()
+            if rebuild or not self._is_current(info, indexed.get(name))
+        ]
+        removed = [name for name in indexed if name not in files]
+
+        summary = {
+            "mode": "rebuild" if rebuild else "incremental",
+            "pipeline_version": get_pipeline_version(),
+            "embedding_model": settings.embedding_model,
+            "collection": active.name,
+            "previous_collection": None,
+            "files_total": len(files),
+            "files_reprocessed": 0,
+            "files_copied": 0,
+            "files_removed": len(removed),
+            "files_reconciled": 0,
+            "chunks_added": 0,
+            "dry_run": dry_run
+        }
+        if dry_run:
+            summary["files_reprocessed"] = len(changed)
+            summary["seconds"] = time.perf_counter() - started
+            return summary
+
+        if rebuild:
+            await self._rebuild_shadow(active, active_model, files, indexed, summary, keep_old, batch_size)
+        else:
+            for name in changed:
+                # Add the new chunks before removing the old ones, so the file stays searchable
+                chunks = await self._process_stored_file(files[name], indexed.get(name))
+                if chunks:
+                    await vector_service.add_documents(chunks)
+                if name in indexed:
+                    await vector_service.delete_documents(indexed[name]['ids'])
+                summary["files_reprocessed"] += 1
+                summary["chunks_added"] += len(chunks)
+                print(f"Reindexed {name}: {len(chunks)} chunks")
+            for name in removed:
+                await vector_service.delete_documents(indexed[name]['ids'])
+                print(f"Removed chunks of deleted file {name}")
+
+        summary["seconds"] = time.perf_counter() - started
+        return summary
+
+    async def _rebuild_shadow(self, active, active_model: str, files: Dict[str, Dict[str, Any]],
+                              indexed: Dict[str, Dict[str, Any]], summary: Dict[str, Any],
+                              keep_old: bool, batch_size: int):
+        """Build a shadow collection, catch up on concurrent uploads, then switch the alias"""
+        shadow_name = f"{vector_service.collection_name}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+        shadow = vector_service.get_collection(shadow_name)
+        # Unchanged chunks can keep their embeddings only if the model is the same
+        can_copy = active_model == settings.embedding_model
+        done = set()
+
+        # Repeat until no uploads or deletions landed in the live collection meanwhile
+        while True:
+            pending = [name for name in files if name not in done]
+            for name in pending:
+                if can_copy and self._is_current(files[name], indexed.get(name)):
+                    await vector_service.copy_file_documents(name, active, shadow)
+                    summary["files_copied"] += 1
+                else:
+                    chunks = await self._process_stored_file(files[name], indexed.get(name))
+                    if chunks:
+                        await vector_service.add_documents(chunks, collection=shadow)
+                    summary["files_reprocessed"] += 1
+                    summary["chunks_added"] += len(chunks)
+                done.add(name)
+                print(f"Rebuilt {name} into {shadow_name}")
+
+            files = {f['filename']: f for f in await storage_service.list_files()}
+            indexed = await self._scan_indexed_files(active, batch_size)
+            for name in [name for name in done if name not in files]:
+                shadow.delete(where={"filename": name})
+                done.discard(name)
+            if all(name in done for name in files):
+                break
+
+        summary["previous_collection"] = vector_service.switch_collection(shadow_name)
+        summary["collection"] = shadow_name
+        await self._reconcile(shadow, summary, batch_size)
+        await vector_service.rebuild_stats(batch_size)
+
+        if not keep_old:
+            vector_service.delete_collection(summary["previous_collection"])
+
+    async def _reconcile(self, collection, summary: Dict[str, Any], batch_size: int):
+        """
+        Bring the newly active collection in line with storage after a switch
+
+        Uploads that finished between the last scan and the switch added their
+        chunks to the old collection only, and uploads that resolved the alias
+        after the switch may have indexed a file the rebuild already covered.
+        Missing files are processed, doubly indexed files are processed again
+        into a single chunk set, and chunks of deleted files are removed.
+        """
+        files = {f['filename']: f for f in await storage_service.list_files()}
+        indexed = await self._scan_indexed_files(collection, batch_size)
+        for name, info in files.items():
+            entry = indexed.get(name)
+            if entry is not None and not entry['duplicated']:
+                continue
+            chunks = await self._process_stored_file(info, entry)
+            if chunks:
+                await vector_service.add_documents(chunks)
+            if entry is not None:
+                await vector_service.delete_documents(entry['ids'])
+            summary["files_reconciled"] += 1
+            summary["chunks_added"] += len(chunks)
+            print(f"Reconciled {name} after the switch")
+        for name in [name for name in indexed if name not in files]:
+            await vector_service.delete_documents(indexed[name]['ids'])
+            summary["files_reconciled"] += 1
+            print(f"Removed chunks of deleted file {name} after the switch")
+        summary["files_total"] = len(files)
+
+
+# Create a singleton instance
+reindex_service = ReindexService()
@@ -0,0 +1,280 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+from app.core.config import settings
+from app.core.shared_state import open_sqlite
+
+
+class StatsService:
+    """
+    Incrementally maintained collection statistics.
+
+    Counters are updated whenever chunks are added to or deleted from the
+    vector database, and persisted in a small local SQLite file so reads never
+    have to scan the ChromaDB collection. The file is shared by all worker
+    processes, so every worker sees the same counters.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.stats_db_path
+        self.rate_window = timedelta(seconds=settings.stats_rate_window_seconds)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _ensure_db(self) -> sqlite3.Connection:
+        """Ensure this process has the SQLite store open and its tables exist"""
+        # SQLite connections must not be shared across a fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = open_sqlite(self.db_path)
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS file_stats (
+                    filename TEXT PRIMARY KEY,
+                    content_type TEXT NOT NULL,
+                    chunks INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    first_indexed_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS content_type_stats (
+                    content_type TEXT PRIMARY KEY,
+                    files INTEGER NOT NULL,
+                    chunks INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS ingestion_events (
+                    ts TEXT NOT NULL,
+                    chunks INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                );
+            """)
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('created_at', ?)",
+                (datetime.utcnow().isoformat(),)
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def group_by_file(texts: Optional[List[Optional[str]]], metadatas: List[Dict[str, Any]],
+                      per_file: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregate chunk counts and UTF-8 byte sizes per stored file
+
+        A chunk's size comes from its 'chunk_bytes' metadata, or for chunks
+        indexed without it, from its text.
+
+        Args:
+            texts: Chunk texts, or None where chunk_bytes metadata is enough
+            metadatas: Chunk metadata, aligned with texts
+            per_file: Totals to add to, so a collection can be aggregated batch by batch
+
+        Returns:
+            Per-file totals
+        """
+        if per_file is None:
+            per_file = {}
+        if texts is None:
+            texts = [None] * len(metadatas)
+        for text, metadata in zip(texts, metadatas):
+            metadata = metadata or {}
+            filename = metadata.get('filename', 'unknown')
+            entry = per_file.setdefault(filename, {
+                'content_type': metadata.get('content_type') or 'unknown',
+                'uploaded_at': metadata.get('uploaded_at'),
+                'chunks': 0,
+                'bytes': 0
+            })
+            entry['chunks'] += 1
+            size = metadata.get('chunk_bytes')
+            if size is None:
+                size = len((text or "").encode('utf-8'))
+            entry['bytes'] += size
+        return per_file
+
+    def _apply(self, conn: sqlite3.Connection, filename: str, content_type: str,
+               chunks: int, size: int, now: str):
+        """Apply a signed chunk/byte delta for one file to both counter tables"""
+        row = conn.execute(
+            "SELECT content_type, chunks, bytes FROM file_stats WHERE filename = ?",
+            (filename,)
+        ).fetchone()
+
+        if row is None:
+            if chunks <= 0:
+                return
+            conn.execute(
+                "INSERT INTO file_stats (filename, content_type, chunks, bytes, first_indexed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (filename, content_type, chunks, size, now)
+            )
+            file_delta = 1
+        else:
+            content_type = row['content_type']
+            new_chunks = max(row['chunks'] + chunks, 0)
+            if new_chunks == 0:
+                chunks, size = -row['chunks'], -row['bytes']
+                conn.execute("DELETE FROM file_stats WHERE filename = ?", (filename,))
+                file_delta = -1
+            else:
+                size = max(row['bytes'] + size, 0) - row['bytes']
+                chunks = new_chunks - row['chunks']
+                conn.execute(
+                    "UPDATE file_stats SET chunks = ?, bytes = bytes + ? WHERE filename = ?",
+                    (new_chunks, size, filename)
+                )
+                file_delta = 0
+
+        conn.execute(
+            "INSERT OR IGNORE INTO content_type_stats (content_type, files, chunks, bytes) "
+            "VALUES (?, 0, 0, 0)",
+            (content_type,)
+        )
+        conn.execute(
+            "UPDATE content_type_stats SET files = files + ?, chunks = chunks + ?, bytes = bytes + ? "
+            "WHERE content_type = ?",
+            (file_delta, chunks, size, content_type)
+        )
+        conn.execute("DELETE FROM content_type_stats WHERE files <= 0 AND chunks <= 0")
+
+    def record_added(self, texts: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Update counters after chunks were added to the vector database
+
+        Args:
+            texts: Chunk texts that were added
+            metadatas: Chunk metadata, aligned with texts
+        """
+        now = datetime.utcnow()
+        per_file = self.group_by_file(texts, metadatas)
+        with self._lock:
+            conn = self._ensure_db()
+            with conn:
+                for filename, entry in per_file.items():
+                    self._apply(conn, filename, entry['content_type'],
+                                entry['chunks'], entry['bytes'], now.isoformat())
+                conn.execute(
+                    "INSERT INTO ingestion_events (ts, chunks, bytes) VALUES (?, ?, ?)",
+                    (now.isoformat(), len(texts), sum(e['bytes'] for e in per_file.values()))
+                )
+                conn.execute(
+                    "DELETE FROM ingestion_events WHERE ts < ?",
+                    ((now - self.rate_window).isoformat(),)
+                )
+
+    def record_deleted(self, texts: Optional[List[Optional[str]]], metadatas: List[Dict[str, Any]]):
+        """
+        Update counters after chunks were deleted from the vector database
+
+        Args:
+            texts: Texts of deleted chunks that lack chunk_bytes metadata, or None
+            metadatas: Chunk metadata, aligned with texts
+        """
+        now = datetime.utcnow().isoformat()
+        per_file = self.group_by_file(texts, metadatas)
+        with self._lock:
+            conn = self._ensure_db()
+            with conn:
+                for filename, entry in per_file.items():
+                    self._apply(conn, filename, entry['content_type'],
+                                -entry['chunks'], -entry['bytes'], now)
+
+    def get_created_at(self) -> str:
+        """Get the time the statistics store was first initialized"""
+        with self._lock:
+            conn = self._ensure_db()
+            row = conn.execute("SELECT value FROM meta WHERE key = 'created_at'").fetchone()
+            return row['value']
+
+    def get_stats(self, include_files: bool = False) -> Dict[str, Any]:
+        """
+        Get the current collection statistics
+
+        Args:
+            include_files: Also return the per-file chunk and byte counts
+
+        Returns:
+            Dictionary with totals, per-content-type breakdown and ingestion rate
+        """
+        now = datetime.utcnow()
+        with self._lock:
+            conn = self._ensure_db()
+            meta = {row['key']: row['value'] for row in conn.execute("SELECT key, value FROM meta")}
+            by_content_type = {
+                row['content_type']: {
+                    'files': row['files'],
+                    'chunks': row['chunks'],
+                    'bytes': row['bytes']
+                }
+                for row in conn.execute("SELECT * FROM content_type_stats")
+            }
+            recent = conn.execute(
+                "SELECT COALESCE(SUM(chunks), 0) AS chunks, COALESCE(SUM(bytes), 0) AS bytes "
+                "FROM ingestion_events WHERE ts >= ?",
+                ((now - self.rate_window).isoformat(),)
+            ).fetchone()
+            files = None
+            if include_files:
+                files = {
+                    row['filename']: {
+                        'content_type': row['content_type'],
+                        'chunks': row['chunks'],
+                        'bytes': row['bytes'],
+                        'first_indexed_at': row['first_indexed_at']
+                    }
+                    for row in conn.execute("SELECT * FROM file_stats ORDER BY filename")
+                }
+
+        window_minutes = self.rate_window.total_seconds() / 60
+        return {
+            'created_at': meta['created_at'],
+            'rebuilt_at': meta.get('rebuilt_at'),
+            'total_files': sum(e['files'] for e in by_content_type.values()),
+            'total_chunks': sum(e['chunks'] for e in by_content_type.values()),
+            'total_bytes': sum(e['bytes'] for e in by_content_type.values()),
+            'by_content_type': by_content_type,
+            'ingestion_rate': {
+                'window_seconds': int(self.rate_window.total_seconds()),
+                'chunks_per_minute': recent['chunks'] / window_minutes,
+                'bytes_per_minute': recent['bytes'] / window_minutes
+            },
+            'files': files
+        }
+
+    def rebuild(self, per_file: Dict[str, Dict[str, Any]], created_at: Optional[str] = None):
+        """
+        Replace all counters with values recomputed from a full collection scan
+
+        Args:
+            per_file: Per-file totals for the whole collection, from group_by_file()
+            created_at: Collection creation time, if known
+        """
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            conn = self._ensure_db()
+            with conn:
+                conn.execute("DELETE FROM file_stats")
+                conn.execute("DELETE FROM content_type_stats")
+                for filename, entry in per_file.items():
+                    self._apply(conn, filename, entry['content_type'],
+                                entry['chunks'], entry['bytes'], entry['uploaded_at'] or now)
+                if created_at:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('created_at', ?)",
+                        (created_at,)
+                    )
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('rebuilt_at', ?)",
+                    (now,)
+                )
+
+
+# Create a singleton instance
+stats_service = StatsService()
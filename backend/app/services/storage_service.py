@@ -32,7 +32,7 @@ class StorageService:
             file_content = await file.read()
             
             # Upload file using bytes with metadata
-            self.s3_client.put_object(
+            response = self.s3_client.put_object(
                 Bucket=self.bucket_name,
                 Key=unique_filename,
                 Body=file_content,
@@ -48,7 +48,8 @@ class StorageService:
                 "original_filename": file.filename,
                 "file_size": len(file_content),
                 "content_type": file.content_type,
-                "uploaded_at": datetime.utcnow().isoformat()
+                "uploaded_at": datetime.utcnow().isoformat(),
+                "content_hash": response['ETag'].strip('"')  # MD5 of the content for single-part uploads
             }
             
         except NoCredentialsError:
@@ -120,7 +121,8 @@ class StorageService:
                         "original_filename": original_filename,
                         "size": obj['Size'],
                         "last_modified": obj['LastModified'].isoformat(),
-                        "content_type": content_type
+                        "content_type": content_type,
+                        "content_hash": obj['ETag'].strip('"')
                     })
             
             return files
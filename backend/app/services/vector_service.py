@@ -1,9 +1,16 @@
 import chromadb
 from chromadb.config import Settings as ChromaSettings
+from chromadb.utils import embedding_functions
 from typing import List, Dict, Optional, Any
 import uuid
+import json
 from datetime import datetime
 from app.core.config import settings
+from app.core.shared_state import shared_cache, collection_aliases
+from app.services.stats_service import stats_service
+
+# Model of Chroma's default embedding function, assumed for collections that predate embedding_model metadata
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
 
 class VectorService:
@@ -32,36 +39,96 @@ class VectorService:
                 settings=chroma_settings
             )
     
-    def _get_or_create_collection(self):
+    def _get_embedding_function(self, model: str):
+        """Get the embedding function for an embedding model"""
+        if model == DEFAULT_EMBEDDING_MODEL:
+            return embedding_functions.DefaultEmbeddingFunction()
+        return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model)
+    
+    def _get_or_create_collection(self, name: Optional[str] = None):
         """
         Get existing collection or create a new one
+        
+        Args:
+            name: Collection name (defaults to the collection the alias points to)
         """
         self._ensure_client()
+        name = name or collection_aliases.resolve(self.collection_name)
         try:
-            # Try to get existing collection
-            collection = self.client.get_collection(self.collection_name)
-            print(f"Using existing collection: {self.collection_name}")
+            # Try to get existing collection, embedding queries with the model it was built with
+            collection = self.client.get_collection(name)
+            model = (collection.metadata or {}).get("embedding_model", DEFAULT_EMBEDDING_MODEL)
+            collection = self.client.get_collection(name, embedding_function=self._get_embedding_function(model))
+            print(f"Using existing collection: {name}")
         except Exception:
             # Create new collection if it doesn't exist
             collection = self.client.create_collection(
-                name=self.collection_name,
-                metadata={"description": "Document embeddings for RAG system"}
+                name=name,
+                metadata={
+                    "description": "Document embeddings for RAG system",
+                    "created_at": datetime.utcnow().isoformat(),
+                    "embedding_model": settings.embedding_model
+                },
+                embedding_function=self._get_embedding_function(settings.embedding_model)
             )
-            print(f"Created new collection: {self.collection_name}")
+            print(f"Created new collection: {name}")
         
         return collection
     
     def _ensure_collection(self):
-        """Ensure collection is initialized"""
-        if self.collection is None:
-            self.collection = self._get_or_create_collection()
+        """Ensure collection is initialized and still the one the alias points to"""
+        name = collection_aliases.resolve(self.collection_name)
+        if self.collection is None or self.collection.name != name:
+            self.collection = self._get_or_create_collection(name)
+    
+    def get_active_collection(self):
+        """Get the collection currently serving requests"""
+        self._ensure_collection()
+        return self.collection
+    
+    def get_collection(self, name: str):
+        """Get or create a collection by its physical name, bypassing the alias"""
+        return self._get_or_create_collection(name)
+    
+    def delete_collection(self, name: str):
+        """Delete a collection by its physical name"""
+        self._ensure_client()
+        self.client.delete_collection(name)
+        print(f"Deleted collection: {name}")
+    
+    def switch_collection(self, name: str) -> str:
+        """
+        Point the collection alias at another collection for every worker
+        
+        Args:
+            name: Collection that should serve requests from now on
+        
+        Returns:
+            The collection that served requests before
+        """
+        previous = collection_aliases.switch(self.collection_name, name)
+        self.collection = None
+        self._invalidate_search_cache()
+        print(f"Switched {self.collection_name} from {previous} to {name}")
+        return previous
+    
+    @property
+    def _search_cache_namespace(self) -> str:
+        return f"search:{self.collection_name}"
     
-    async def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
+    def _invalidate_search_cache(self):
+        """Drop cached search results in every worker after the collection changed"""
+        shared_cache.invalidate(self._search_cache_namespace)
+    
+    async def add_documents(self, documents: List[Dict[str, Any]], collection=None) -> List[str]:
         """
         Add documents to the vector database
         
         Args:
             documents: List of dicts with keys: 'text', 'metadata', 'filename'
+            collection: Collection to add to instead of the active one, e.g. a
+                shadow collection being rebuilt. Statistics and the search
+                cache are left alone for it.
         
         Returns:
             List of document IDs
@@ -73,12 +140,16 @@ class VectorService:
             ids = [str(uuid.uuid4()) for _ in documents]
             
             # Add documents to collection
-            self.collection.add(
+            (collection or self.collection).add(
                 documents=texts,
                 metadatas=metadatas,
                 ids=ids
             )
             
+            if collection is None:
+                stats_service.record_added(texts, metadatas)
+                self._invalidate_search_cache()
+            
             print(f"Added {len(documents)} documents to vector database")
             return ids
             
@@ -86,6 +157,36 @@ class VectorService:
             print(f"Error adding documents to vector database: {str(e)}")
             raise Exception(f"Failed to add documents: {str(e)}")
     
+    async def copy_file_documents(self, filename: str, source, target) -> int:
+        """
+        Copy a file's chunks, including their embeddings, between collections
+        
+        Args:
+            filename: Stored filename whose chunks are copied
+            source: Collection to copy from
+            target: Collection to copy to
+        
+        Returns:
+            Number of chunks copied
+        """
+        try:
+            results = source.get(
+                where={"filename": filename},
+                include=["documents", "metadatas", "embeddings"]
+            )
+            if results['ids']:
+                target.add(
+                    ids=results['ids'],
+                    documents=results['documents'],
+                    metadatas=results['metadatas'],
+                    embeddings=results['embeddings']
+                )
+            return len(results['ids'])
+            
+        except Exception as e:
+            print(f"Error copying documents: {str(e)}")
+            raise Exception(f"Failed to copy documents: {str(e)}")
+    
     async def search_documents(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
         """
         Search for similar documents
@@ -98,7 +199,15 @@ class VectorService:
             List of similar documents with metadata
         """
         self._ensure_collection()
+        cache_key = json.dumps([query, n_results], ensure_ascii=False)
+        use_cache = settings.search_cache_ttl_seconds > 0
         try:
+            if use_cache:
+                cached = shared_cache.get(self._search_cache_namespace, cache_key)
+                if cached is not None:
+                    return cached
+                generation = shared_cache.generation(self._search_cache_namespace)
+            
             results = self.collection.query(
                 query_texts=[query],
                 n_results=n_results
@@ -114,6 +223,12 @@ class VectorService:
                         'id': results['ids'][0][i] if results['ids'] and results['ids'][0] else None
                     })
             
+            if use_cache:
+                shared_cache.set(
+                    self._search_cache_namespace, cache_key, documents,
+                    generation, settings.search_cache_ttl_seconds
+                )
+            
             return documents
             
         except Exception as e:
@@ -132,7 +247,23 @@ class VectorService:
         """
         self._ensure_collection()
         try:
+            # Fetch the metadata of what is being deleted so the statistics can be decremented
+            existing = self.collection.get(ids=document_ids, include=["metadatas"])
+            metadatas = [metadata or {} for metadata in existing['metadatas']]
+            
+            # Only chunks indexed before chunk_bytes was recorded need their text for the byte count
+            texts = None
+            legacy_ids = [
+                doc_id for doc_id, metadata in zip(existing['ids'], metadatas) if 'chunk_bytes' not in metadata
+            ]
+            if legacy_ids:
+                legacy = self.collection.get(ids=legacy_ids, include=["documents"])
+                legacy_texts = dict(zip(legacy['ids'], legacy['documents']))
+                texts = [legacy_texts.get(doc_id) for doc_id in existing['ids']]
+            
             self.collection.delete(ids=document_ids)
+            stats_service.record_deleted(texts, metadatas)
+            self._invalidate_search_cache()
             print(f"Deleted {len(document_ids)} documents from vector database")
             return True
             
@@ -153,41 +284,156 @@ class VectorService:
             return {
                 "collection_name": self.collection_name,
                 "document_count": count,
-                "created_at": datetime.utcnow().isoformat()
+                "created_at": self._get_created_at()
             }
             
         except Exception as e:
             print(f"Error getting collection info: {str(e)}")
             raise Exception(f"Failed to get collection info: {str(e)}")
     
-    async def list_documents(self, limit: int = 100) -> List[Dict[str, Any]]:
+    def _get_created_at(self) -> str:
+        """
+        Get the collection creation time, falling back to when statistics
+        tracking started for collections created before it was recorded
+        """
+        metadata = self.collection.metadata or {}
+        return metadata.get("created_at") or stats_service.get_created_at()
+    
+    async def get_collection_stats(self, include_files: bool = False) -> Dict[str, Any]:
+        """
+        Get incrementally maintained statistics for the collection
+        
+        Args:
+            include_files: Also return per-file chunk and byte counts
+        
+        Returns:
+            Dictionary with collection statistics
+        """
+        self._ensure_collection()
+        try:
+            stats = stats_service.get_stats(include_files)
+            stats["collection_name"] = self.collection_name
+            stats["created_at"] = self._get_created_at()
+            return stats
+            
+        except Exception as e:
+            print(f"Error getting collection stats: {str(e)}")
+            raise Exception(f"Failed to get collection stats: {str(e)}")
+    
+    async def rebuild_stats(self, batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Recompute the collection statistics with a full scan, correcting any drift
+        
+        Args:
+            batch_size: Number of documents fetched from ChromaDB per request
+        
+        Returns:
+            Dictionary with the rebuilt collection statistics
+        """
+        self._ensure_collection()
+        try:
+            # Only per-file totals are kept, so memory does not grow with the corpus
+            per_file = {}
+            document_count = 0
+            offset = 0
+            while True:
+                results = self.collection.get(
+                    limit=batch_size,
+                    offset=offset,
+                    include=["documents", "metadatas"]
+                )
+                stats_service.group_by_file(results['documents'], results['metadatas'], per_file)
+                document_count += len(results['ids'])
+                if len(results['ids']) < batch_size:
+                    break
+                offset += batch_size
+            
+            metadata = self.collection.metadata or {}
+            stats_service.rebuild(per_file, metadata.get("created_at"))
+            print(f"Rebuilt statistics from {document_count} documents")
+            return await self.get_collection_stats()
+            
+        except Exception as e:
+            print(f"Error rebuilding collection stats: {str(e)}")
+            raise Exception(f"Failed to rebuild collection stats: {str(e)}")
+    
+    async def list_documents(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        include: Optional[List[str]] = None,
+        filename: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        List documents in the collection
+        List documents in the collection, one page at a time
         
         Args:
             limit: Maximum number of documents to return
+            offset: Number of documents to skip before the page starts
+            include: Fields to fetch from ChromaDB ('documents', 'metadatas').
+                Ids are always returned; omit 'documents' to skip transferring chunk text.
+            filename: Only return chunks belonging to this stored file
         
         Returns:
-            List of documents with metadata
+            Dictionary with the page of documents and the offset of the next page
         """
         self._ensure_collection()
+        if include is None:
+            include = ["documents", "metadatas"]
         try:
-            results = self.collection.get(limit=limit)
+            # Fetch one extra row so we know whether another page exists
+            results = self.collection.get(
+                where={"filename": filename} if filename else None,
+                limit=limit + 1,
+                offset=offset,
+                include=include
+            )
+            
+            ids = results['ids'][:limit]
+            texts = results.get('documents') or []
+            metadatas = results.get('metadatas') or []
             
             documents = []
-            if results['documents']:
-                for i, doc in enumerate(results['documents']):
-                    documents.append({
-                        'id': results['ids'][i],
-                        'text': doc[:200] + "..." if len(doc) > 200 else doc,  # Truncate long text
-                        'metadata': results['metadatas'][i] if results['metadatas'] else {}
-                    })
+            for i, doc_id in enumerate(ids):
+                text = texts[i] if i < len(texts) else None
+                if text is not None and len(text) > 200:
+                    text = text[:200] + "..."  # Truncate long text
+                documents.append({
+                    'id': doc_id,
+                    'text': text,
+                    'metadata': metadatas[i] if i < len(metadatas) else None
+                })
             
-            return documents
+            has_more = len(results['ids']) > limit
+            return {
+                "documents": documents,
+                "offset": offset,
+                "limit": limit,
+                "next_offset": offset + limit if has_more else None
+            }
             
         except Exception as e:
             print(f"Error listing documents: {str(e)}")
             raise Exception(f"Failed to list documents: {str(e)}")
+    
+    async def get_document_ids(self, filename: str) -> List[str]:
+        """
+        Get the IDs of all chunks belonging to a stored file
+        
+        Args:
+            filename: Stored (unique) filename the chunks were created from
+        
+        Returns:
+            List of document IDs
+        """
+        self._ensure_collection()
+        try:
+            results = self.collection.get(where={"filename": filename}, include=[])
+            return results['ids']
+            
+        except Exception as e:
+            print(f"Error getting document IDs: {str(e)}")
+            raise Exception(f"Failed to get document IDs: {str(e)}")
 
 
 # Create a singleton instance
@@ -0,0 +1,76 @@
+import pytest
+from starlette.requests import Request
+from app.core import admission
+from app.core.admission import RateLimiter, client_key
+from app.core.config import settings
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def limiter(monkeypatch, clock):
+    monkeypatch.setattr(settings, "web_concurrency", 2)
+    monkeypatch.setattr(settings, "rate_limit_capacity", 10.0)
+    monkeypatch.setattr(settings, "rate_limit_refill_per_second", 2.0)
+    return RateLimiter()
+
+
+def _request(headers=None, host="10.0.0.1"):
+    return Request({
+        "type": "http",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": (host, 1234),
+    })
+
+
+def test_bucket_is_split_across_workers(limiter):
+    assert (limiter.capacity, limiter.refill_rate) == (5.0, 1.0)
+
+
+def test_bucket_rejects_when_empty_and_refills_over_time(limiter, clock):
+    assert [limiter.acquire("a", 2) for _ in range(2)] == [0, 0]
+    assert limiter.acquire("a", 2) == pytest.approx(1.0)
+
+    clock[0] += 1
+    assert limiter.acquire("a", 2) == 0
+
+
+def test_buckets_are_per_client(limiter):
+    limiter.acquire("a", 5)
+
+    assert limiter.acquire("a", 1) > 0
+    assert limiter.acquire("b", 1) == 0
+
+
+def test_request_costing_more_than_capacity_passes_with_a_full_bucket(limiter):
+    assert limiter.acquire("a", 50) == 0
+    assert limiter.acquire("a", 50) == pytest.approx(5.0)
+
+
+def test_only_configured_api_keys_get_their_own_bucket(monkeypatch):
+    monkeypatch.setattr(settings, "api_keys", ["team-key"])
+
+    assert client_key(_request({"X-API-Key": "team-key"})).startswith("key:")
+    assert "team-key" not in client_key(_request({"X-API-Key": "team-key"}))
+    assert client_key(_request({"X-API-Key": "random"})) == "ip:10.0.0.1"
+
+
+def test_forwarded_for_is_ignored_unless_trusted(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_trust_forwarded_for", False)
+
+    assert client_key(_request({"X-Forwarded-For": "1.2.3.4"})) == "ip:10.0.0.1"
+
+
+def test_forwarded_for_is_read_from_the_right(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_trust_forwarded_for", True)
+    monkeypatch.setattr(settings, "rate_limit_proxy_hops", 1)
+    assert client_key(_request({"X-Forwarded-For": "6.6.6.6, 1.2.3.4"})) == "ip:1.2.3.4"
+
+    monkeypatch.setattr(settings, "rate_limit_proxy_hops", 2)
+    assert client_key(_request({"X-Forwarded-For": "6.6.6.6, 1.2.3.4, 10.0.0.9"})) == "ip:1.2.3.4"
+    assert client_key(_request({"X-Forwarded-For": "1.2.3.4"})) == "ip:10.0.0.1"
@@ -0,0 +1,109 @@
+import pytest
+import tiktoken
+from app.core.config import settings
+from app.services.answer_service import AnswerService, TokenCounter
+
+
+@pytest.fixture
+def counter():
+    # A byte-level encoding with one special token, so no download is needed
+    counter = TokenCounter()
+    counter._encoding = tiktoken.Encoding(
+        name="bytes",
+        pat_str=r"[\s\S]",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={"<|endoftext|>": 256}
+    )
+    counter._loaded = True
+    return counter
+
+
+@pytest.fixture
+def service(counter):
+    service = AnswerService()
+    service.token_counter = counter
+    return service
+
+
+def _result(text, chunk_index, char_start=None, distance=0.5, filename="f.txt", **extra):
+    metadata = {"filename": filename, "chunk_index": chunk_index, **extra}
+    if char_start is not None:
+        metadata["char_start"] = char_start
+    return {"text": text, "metadata": metadata, "distance": distance}
+
+
+def test_token_counter_accepts_special_token_text(counter):
+    assert counter.count("hi <|endoftext|>") == 16
+
+
+def test_token_counter_truncates_to_budget(counter):
+    assert counter.truncate("abcdef", 4) == "abcd"
+
+
+def test_merge_uses_offsets_to_drop_the_overlap(service):
+    text = "The first chunk ends here. The second chunk continues the text."
+    results = [
+        _result(text[27:], 1, char_start=27, distance=0.2, page_start=2, page_end=2),
+        _result(text[:35], 0, char_start=0, distance=0.4, page_start=1, page_end=1),
+    ]
+
+    [passage] = service.merge_chunks(results)
+
+    assert passage["text"] == text
+    assert (passage["chunk_start"], passage["chunk_end"]) == (0, 1)
+    assert (passage["page_start"], passage["page_end"]) == (1, 2)
+    assert passage["distance"] == 0.2
+
+
+def test_merge_without_offsets_ignores_short_coincidental_overlaps(service, monkeypatch):
+    monkeypatch.setattr(settings, "chunk_overlap", 200)
+    results = [_result("the war ended the w", 0), _result("wargued otherwise", 1)]
+
+    [passage] = service.merge_chunks(results)
+
+    assert passage["text"] == "the war ended the w\nwargued otherwise"
+
+
+def test_merge_without_offsets_drops_a_real_overlap(service, monkeypatch):
+    monkeypatch.setattr(settings, "chunk_overlap", 200)
+    shared = "a shared sentence of some length"
+    results = [_result("First part, " + shared, 0), _result(shared + ", second part", 1)]
+
+    [passage] = service.merge_chunks(results)
+
+    assert passage["text"] == "First part, " + shared + ", second part"
+
+
+def test_merge_deduplicates_and_keeps_gaps_and_files_apart(service):
+    results = [
+        _result("zero", 0, char_start=0, distance=0.3),
+        _result("zero", 0, char_start=0, distance=0.3),
+        _result("two", 2, char_start=10, distance=0.1),
+        _result("other", 0, char_start=0, distance=0.2, filename="g.txt"),
+    ]
+
+    passages = service.merge_chunks(results)
+
+    assert [(p["filename"], p["text"]) for p in passages] == [("f.txt", "two"), ("g.txt", "other"), ("f.txt", "zero")]
+
+
+def test_pack_truncates_the_passage_that_overflows(service):
+    passages = [{"text": "x" * 500}, {"text": "y" * 50}]
+
+    packed = service.pack_context(passages, 200)
+
+    assert [(p["text"][0], p["tokens"], p.get("truncated")) for p in packed] == [("x", 200, True)]
+
+
+def test_pack_skips_to_smaller_passages_when_little_budget_is_left(service):
+    passages = [{"text": "a" * 150}, {"text": "b" * 500}, {"text": "c" * 20}]
+
+    packed = service.pack_context(passages, 200)
+
+    assert [(p["text"][0], p["tokens"]) for p in packed] == [("a", 150), ("c", 20)]
+
+
+def test_pack_never_returns_an_empty_context_for_a_small_budget(service):
+    packed = service.pack_context([{"text": "z" * 500}], 10)
+
+    assert packed[0]["tokens"] == 10
@@ -0,0 +1,51 @@
+import pytest
+from app.core.config import settings
+from app.services.document_service import DocumentService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "chunk_size", 100)
+    monkeypatch.setattr(settings, "chunk_overlap", 30)
+    return DocumentService()
+
+
+def test_chunks_record_their_offset_and_byte_size(service):
+    text = "\n".join(" ".join(f"page{n}-word{i}" for i in range(20)) for n in range(3))
+    chunks = service.chunk_text(text, {"filename": "f.txt"})
+
+    assert len(chunks) > 3
+    for chunk in chunks:
+        start = chunk["metadata"]["char_start"]
+        assert text[start:start + len(chunk["text"])] == chunk["text"]
+        assert chunk["metadata"]["chunk_bytes"] == len(chunk["text"].encode("utf-8"))
+
+
+def test_chunk_byte_size_counts_utf8_bytes(service):
+    chunks = service.chunk_text("שלום עולם", {})
+
+    assert chunks[0]["metadata"]["chunk_size"] == 9
+    assert chunks[0]["metadata"]["chunk_bytes"] == 17
+
+
+def test_chunks_map_to_the_pages_they_span(service):
+    pages = ["one " * 8, "two " * 8, "three " * 30, "four " * 8]
+    chunks = service.chunk_segments(pages, {"filename": "f.pdf"}, "page")
+
+    # ends[n - 1] is the offset of the newline that ends page n in the joined text
+    ends, offset = [], -1
+    for page in pages:
+        offset += len(page) + 1
+        ends.append(offset)
+
+    def page_of(position):
+        return next(n for n, end in enumerate(ends, start=1) if position <= end)
+
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        start = metadata["char_start"]
+        assert metadata["page_start"] == page_of(start)
+        assert metadata["page_end"] == page_of(start + len(chunk["text"]) - 1)
+    assert chunks[0]["metadata"]["page_start"] == 1
+    assert chunks[-1]["metadata"]["page_end"] == 4
+    assert any(c["metadata"]["page_start"] != c["metadata"]["page_end"] for c in chunks)
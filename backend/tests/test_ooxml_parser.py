@@ -0,0 +1,122 @@
+import io
+import zipfile
+from app.services.ooxml_parser import extract_docx_sections, extract_pptx_slides
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+MC = 'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"'
+WPS = 'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape"'
+V = 'xmlns:v="urn:schemas-microsoft-com:vml"'
+A = 'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+P = 'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+R = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+RELS = 'xmlns="http://schemas.openxmlformats.org/package/2006/relationships"'
+SLIDE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+NOTES_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+
+
+def _package(parts):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, xml in parts.items():
+            archive.writestr(name, xml)
+    return buffer.getvalue()
+
+
+def _docx(body):
+    return _package({"word/document.xml": f"<w:document {W} {MC} {WPS} {V}><w:body>{body}</w:body></w:document>"})
+
+
+def _p(text, extra=""):
+    return f"<w:p>{extra}<w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+def _rels(*relationships):
+    entries = "".join(
+        f'<Relationship Id="{rel_id}" Type="{rel_type}" Target="{target}"/>'
+        for rel_id, rel_type, target in relationships
+    )
+    return f"<Relationships {RELS}>{entries}</Relationships>"
+
+
+def _shape(text, placeholder=None):
+    ph = f'<p:nvSpPr><p:nvPr><p:ph type="{placeholder}"/></p:nvPr></p:nvSpPr>' if placeholder else ""
+    return f"<p:sp>{ph}<p:txBody><a:p><a:r><a:t>{text}</a:t></a:r></a:p></p:txBody></p:sp>"
+
+
+def _slide(content):
+    return f"<p:sld {P} {A} {MC}><p:cSld><p:spTree>{content}</p:spTree></p:cSld></p:sld>"
+
+
+def test_docx_splits_sections_and_renders_tables():
+    body = (
+        _p("Intro")
+        + "<w:tbl><w:tr><w:tc>" + _p("A1") + "</w:tc><w:tc>" + _p("B1") + "</w:tc></w:tr>"
+        + "<w:tr><w:tc>" + _p("A2") + "</w:tc><w:tc>" + _p("B2") + "</w:tc></w:tr></w:tbl>"
+        + _p("End of one", "<w:pPr><w:sectPr/></w:pPr>")
+        + _p("Second section")
+    )
+
+    assert extract_docx_sections(_docx(body)) == ["Intro\nA1 | B1\nA2 | B2\nEnd of one", "Second section"]
+
+
+def test_docx_text_box_follows_its_paragraph_once():
+    box = "<w:txbxContent>" + _p("Box text") + "</w:txbxContent>"
+    body = (
+        "<w:p><w:r><w:t xml:space=\"preserve\">Before </w:t></w:r><w:r><mc:AlternateContent>"
+        f"<mc:Choice Requires=\"wps\"><w:drawing><wps:txbx>{box}</wps:txbx></w:drawing></mc:Choice>"
+        f"<mc:Fallback><w:pict><v:textbox>{box}</v:textbox></w:pict></mc:Fallback>"
+        "</mc:AlternateContent></w:r><w:r><w:t>after</w:t></w:r></w:p>"
+    )
+
+    assert extract_docx_sections(_docx(body)) == ["Before after\nBox text"]
+
+
+def test_docx_without_text_returns_one_empty_section():
+    assert extract_docx_sections(_docx("")) == [""]
+
+
+def test_pptx_follows_presentation_order_with_groups_tables_and_notes():
+    table = (
+        "<p:graphicFrame><a:graphic><a:graphicData><a:tbl>"
+        "<a:tr><a:tc><a:txBody><a:p><a:r><a:t>K</a:t></a:r></a:p></a:txBody></a:tc>"
+        "<a:tc><a:txBody><a:p><a:r><a:t>V</a:t></a:r></a:p></a:txBody></a:tc></a:tr>"
+        "</a:tbl></a:graphicData></a:graphic></p:graphicFrame>"
+    )
+    notes = (
+        f"<p:notes {P} {A}><p:cSld><p:spTree>"
+        + _shape("Slide image", "sldImg") + _shape("Speaker note", "body") + _shape("2", "sldNum")
+        + "</p:spTree></p:cSld></p:notes>"
+    )
+    archive = _package({
+        "ppt/presentation.xml": (
+            f"<p:presentation {P} {R}><p:sldIdLst>"
+            '<p:sldId id="256" r:id="rId2"/><p:sldId id="257" r:id="rId1"/>'
+            "</p:sldIdLst></p:presentation>"
+        ),
+        # Absolute and relative targets both resolve to parts in the package
+        "ppt/_rels/presentation.xml.rels": _rels(
+            ("rId1", SLIDE_REL, "slides/slide1.xml"), ("rId2", SLIDE_REL, "/ppt/slides/slide2.xml")
+        ),
+        "ppt/slides/slide1.xml": _slide(_shape("Title") + "<p:grpSp>" + _shape("Grouped") + "</p:grpSp>" + table),
+        "ppt/slides/slide2.xml": _slide(_shape("First shown")),
+        "ppt/slides/_rels/slide1.xml.rels": _rels(("rId1", NOTES_REL, "../notesSlides/notesSlide1.xml")),
+        "ppt/notesSlides/notesSlide1.xml": notes,
+    })
+
+    assert extract_pptx_slides(archive) == ["First shown", "Title\nGrouped\nK | V\nSpeaker note"]
+
+
+def test_pptx_skips_fallback_copies():
+    content = (
+        "<mc:AlternateContent><mc:Choice Requires=\"p14\">" + _shape("Once") + "</mc:Choice>"
+        "<mc:Fallback>" + _shape("Once") + "</mc:Fallback></mc:AlternateContent>"
+    )
+    archive = _package({
+        "ppt/presentation.xml": (
+            f"<p:presentation {P} {R}><p:sldIdLst><p:sldId id=\"256\" r:id=\"rId1\"/></p:sldIdLst></p:presentation>"
+        ),
+        "ppt/_rels/presentation.xml.rels": _rels(("rId1", SLIDE_REL, "slides/slide1.xml")),
+        "ppt/slides/slide1.xml": _slide(content),
+    })
+
+    assert extract_pptx_slides(archive) == ["Once"]